@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from {{ cookiecutter.project_slug }}.apps.common.assets import MANIFEST_FILENAME, registry
+
+# Shaped like the output of `npm run build`, so tags are rendered as in dist.
+MANIFEST = {
+    'app': {
+        'js': ['/static/js/lib-vue.3f2a1c.js', '/static/js/app.9b8e7d.js'],
+        'css': ['/static/css/app.5c4d3e.css'],
+    },
+    'hello_world_mount': {
+        'js': ['/static/js/hello_world_mount.1a2b3c.js'],
+        'css': [],
+    },
+}
+
+GDPR_SETTINGS = {
+    'title': 'Privacy settings',
+    'description': 'We use cookies to improve your experience <and> analyze traffic.',
+    'categories': [
+        {'name': 'gdpr-personalization', 'label': 'Personalization', 'required': False},
+        {'name': 'gdpr-analytics', 'label': 'Analytics', 'required': False},
+        {'name': 'gdpr-marketing', 'label': 'Marketing', 'required': False},
+    ],
+}
+
+CONSENT_COOKIES = {
+    'gdpr': 'accepted',
+    'gdpr-personalization': 'false',
+    'gdpr-analytics': 'accepted',
+    'csrftoken': 'y' * 32,
+}
+
+
+@pytest.fixture(autouse=True)
+def benchmark_settings(settings, tmp_path):
+    """Settings of the benchmarked code, independent of the local setup."""
+    (tmp_path / MANIFEST_FILENAME).write_text(json.dumps(MANIFEST))
+    settings.STATIC_ROOT = str(tmp_path)
+    settings.STATICFILES_DIRS = []
+    settings.GDPR_SETTINGS = GDPR_SETTINGS
+    settings.DEBUG = False
+    # Measure the code of the request, not a fraction of sampled requests.
+    settings.SERVER_TIMING_SAMPLE_RATE = 0.0
+    registry.load()
+
+    yield settings
+
+    registry.loaded = False
+
+
+@pytest.fixture
+def consent_cookies():
+    return dict(CONSENT_COOKIES)
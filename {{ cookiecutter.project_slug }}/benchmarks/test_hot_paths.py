@@ -0,0 +1,122 @@
+"""
+Micro benchmarks of code running on every request.
+"""
+
+import json
+import logging
+
+import pytest
+
+from django.template import Context
+
+from {{ cookiecutter.project_slug }}.apps.common.assets import registry
+from {{ cookiecutter.project_slug }}.apps.common.consent import Consent
+from {{ cookiecutter.project_slug }}.apps.common.context_processors import gdpr
+from {{ cookiecutter.project_slug }}.apps.common.formatters import DjangoRequestJsonFormatter
+from {{ cookiecutter.project_slug }}.apps.common.templatetags.gdpr import gdpr_settings
+from {{ cookiecutter.project_slug }}.apps.common.templatetags.render_assets import (
+    render_css,
+    render_js,
+)
+from {{ cookiecutter.project_slug }}.apps.common.utils import is_consent_accepted
+
+
+@pytest.mark.benchmark(group='assets')
+def test_registry_get(benchmark):
+    assert benchmark(registry.get, 'app', 'js')
+
+
+@pytest.mark.benchmark(group='assets')
+def test_render_css(benchmark, rf):
+    context = Context({'request': rf.get('/')})
+    assert benchmark(render_css, context, 'app')
+
+
+@pytest.mark.benchmark(group='assets')
+def test_render_js(benchmark, rf):
+    context = Context({'request': rf.get('/')})
+    assert benchmark(render_js, context, 'app')
+
+
+@pytest.mark.benchmark(group='gdpr')
+def test_gdpr_context_processor(benchmark, rf):
+    request = rf.get('/')
+
+    def run():
+        # The value is lazy, templates using it turn it into a string.
+        return str(gdpr(request)['GDPR_SETTINGS'])
+
+    assert benchmark(run)
+
+
+@pytest.mark.benchmark(group='gdpr')
+def test_gdpr_settings_tag(benchmark):
+    assert benchmark(gdpr_settings)
+
+
+@pytest.mark.benchmark(group='consent')
+def test_is_consent_accepted_first(benchmark, rf, consent_cookies):
+    """The first check of a request, which parses all consent cookies."""
+
+    def setup():
+        request = rf.get('/')
+        request.COOKIES = consent_cookies
+        return (request, 'gdpr-analytics'), {}
+
+    assert benchmark.pedantic(is_consent_accepted, setup=setup, rounds=5000)
+
+
+@pytest.mark.benchmark(group='consent')
+def test_is_consent_accepted_parsed(benchmark, rf, consent_cookies):
+    """Further checks of a request, with `request.consent` already parsed."""
+    request = rf.get('/')
+    request.COOKIES = consent_cookies
+    request.consent = Consent.from_request(request)
+
+    assert benchmark(is_consent_accepted, request, 'gdpr-analytics')
+
+
+@pytest.fixture
+def error_record(rf):
+    request = rf.post(
+        '/api/orders/?page=2',
+        data=json.dumps({'items': [{'id': index, 'count': 1} for index in range(20)]}),
+        content_type='application/json',
+        headers={
+            'Accept': 'application/json',
+            'Accept-Language': 'en-US,en;q=0.9,pl;q=0.8',
+            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Firefox/128.0',
+            'Cookie': 'sessionid=secret',
+        },
+    )
+    record = logging.LogRecord(
+        'django.request',
+        logging.ERROR,
+        __file__,
+        1,
+        'Internal Server Error: %s',
+        (request.path,),
+        None,
+    )
+    record.request = request
+    return record
+
+
+@pytest.mark.benchmark(group='logging')
+def test_formatter_add_fields(benchmark, error_record):
+    formatter = DjangoRequestJsonFormatter()
+    error_record.message = error_record.getMessage()
+
+    def run():
+        log_record = {}
+        formatter.add_fields(log_record, error_record, {})
+        return log_record
+
+    assert 'request' in benchmark(run)
+
+
+@pytest.mark.benchmark(group='logging')
+def test_formatter_format(benchmark, error_record):
+    formatter = DjangoRequestJsonFormatter('%(levelname)s %(asctime)s %(message)s')
+
+    assert benchmark(formatter.format, error_record)
@@ -0,0 +1,39 @@
+"""
+Whole request benchmarks, through all middleware of the active settings.
+"""
+
+import pytest
+
+pytestmark = pytest.mark.urls('benchmarks.urls')
+
+
+@pytest.fixture
+def consent_client(client, consent_cookies):
+    client.cookies.load(consent_cookies)
+    return client
+
+
+@pytest.mark.benchmark(group='requests')
+def test_base_template(benchmark, consent_client):
+    """Renders `base.html` with assets and GDPR context on every request."""
+    response = benchmark(consent_client.get, '/benchmarks/base/')
+
+    assert response.status_code == 200
+
+
+@pytest.mark.benchmark(group='requests')
+def test_page_cache_hit(benchmark, consent_client):
+    consent_client.get('/hello/world/')
+    response = benchmark(consent_client.get, '/hello/world/')
+
+    assert response.status_code == 200
+
+
+@pytest.mark.benchmark(group='requests')
+def test_page_cache_not_modified(benchmark, consent_client):
+    etag = consent_client.get('/hello/world/')['ETag']
+    response = benchmark(
+        consent_client.get, '/hello/world/', headers={'If-None-Match': etag}
+    )
+
+    assert response.status_code == 304
@@ -0,0 +1,8 @@
+from django.urls import path
+from django.views.generic import TemplateView
+
+from {{ cookiecutter.project_slug }}.urls import urlpatterns
+
+urlpatterns = [
+    path('benchmarks/base/', TemplateView.as_view(template_name='base.html')),
+] + urlpatterns
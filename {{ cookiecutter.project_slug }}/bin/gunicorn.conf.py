@@ -0,0 +1,192 @@
+"""
+Gunicorn configuration shared by `gunicorn.base` and `gunicorn-asgi.base`.
+
+Workers and threads are sized from the CPUs available to the process and the
+memory left on the box, every value can be overridden from the environment:
+
+    GUNICORN_WORKERS             - Number of worker processes.
+    GUNICORN_THREADS             - Threads per sync worker (gthread if > 1).
+    GUNICORN_WORKER_MEMORY       - Expected memory per worker in MB (default 200).
+    GUNICORN_MAX_REQUESTS        - Requests before a worker is replaced (default 2000,
+                                   0 disables it).
+    GUNICORN_MAX_REQUESTS_JITTER - Random extra requests, so workers are not
+                                   replaced at once (default 10% of max requests).
+    GUNICORN_PRELOAD             - Load the app before forking (default 1).
+    GUNICORN_TIMEOUT             - Worker timeout in seconds (default 30).
+    GUNICORN_LOG_LEVEL           - Log level (default info).
+    GUNICORN_WORKER_CLASS        - Worker class, set by the launchers.
+    GUNICORN_WARM_TEMPLATES      - Compile all templates at boot (default 1).
+
+For more information on the settings, see
+https://docs.gunicorn.org/en/stable/settings.html
+"""
+
+import math
+import os
+import sys
+import time
+
+STARTED_AT = time.monotonic()
+
+DEFAULT_WORKER_MEMORY = 200
+MAX_THREADS = 4
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def cpu_count():
+    """Returns the number of CPUs the process may run on."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    # CPU quota of a container (cgroup v2), e.g. `docker run --cpus`.
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+
+    return max(cpus, 1)
+
+
+def available_memory():
+    """Returns available memory in MB, or None if it can't be read."""
+    memory = None
+
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    memory = int(line.split()[1]) // 1024
+                    break
+    except (OSError, ValueError):
+        pass
+
+    # Memory limit of a container (cgroup v2).
+    try:
+        with open('/sys/fs/cgroup/memory.max') as f:
+            limit = f.read().strip()
+        if limit != 'max':
+            limit = int(limit) // (1024 * 1024)
+            memory = limit if memory is None else min(memory, limit)
+    except (OSError, ValueError):
+        pass
+
+    return memory
+
+
+def size_workers(cpus, memory, worker_memory, is_async):
+    """Returns (workers, threads) for the given resources.
+
+    Sync workers follow the usual `2 * CPUs + 1`; an event loop worker
+    uses a whole CPU, so there is one per CPU. When memory does not fit
+    that many processes, sync workers get threads to keep the concurrency.
+    """
+    target = cpus if is_async else 2 * cpus + 1
+    workers = target
+    if memory is not None:
+        workers = max(1, min(workers, memory // worker_memory))
+
+    if is_async:
+        return workers, 1
+    return workers, min(MAX_THREADS, math.ceil(target / workers))
+
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+is_async = worker_class not in ('sync', 'gthread')
+
+workers, threads = size_workers(
+    cpu_count(),
+    available_memory(),
+    env_int('GUNICORN_WORKER_MEMORY', DEFAULT_WORKER_MEMORY),
+    is_async,
+)
+workers = env_int('GUNICORN_WORKERS', workers)
+threads = env_int('GUNICORN_THREADS', threads)
+if threads > 1 and worker_class == 'sync':
+    worker_class = 'gthread'
+
+# Workers share the memory of the loaded app (copy-on-write).
+preload_app = bool(env_int('GUNICORN_PRELOAD', 1))
+
+# Replace workers periodically to contain memory leaks.
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+warm_templates = bool(env_int('GUNICORN_WARM_TEMPLATES', 1))
+
+# Heartbeat files of workers, on disk they may block on slow IO.
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+
+def compile_templates(log):
+    """Fills the cached template loader, failing on template syntax errors."""
+    from {{ cookiecutter.project_slug }}.apps.common.management.commands.warm_templates import (
+        warm_templates as compile_all,
+    )
+
+    started_at = time.monotonic()
+    compiled, errors = compile_all()
+    for name, error in errors:
+        log.error('Template %s: %s', name, error)
+    if errors:
+        raise RuntimeError(f'{len(errors)} templates have syntax errors')
+
+    log.info(
+        'Compiled %d templates in %.0f ms', compiled, (time.monotonic() - started_at) * 1000
+    )
+
+
+def when_ready(server):
+    # With preload workers inherit the compiled templates of the master.
+    if server.cfg.preload_app and warm_templates:
+        compile_templates(server.log)
+
+    server.log.info(
+        'Master ready in %.0f ms: %d %s workers, %d threads, max requests %d (+%d)',
+        (time.monotonic() - STARTED_AT) * 1000,
+        server.cfg.workers,
+        server.cfg.worker_class_str,
+        server.cfg.threads,
+        server.cfg.max_requests,
+        server.cfg.max_requests_jitter,
+    )
+
+
+def pre_fork(server, worker):
+    # Connections opened while loading the app must not be shared by workers.
+    if 'django.db' in sys.modules:
+        from django.db import connections
+
+        connections.close_all()
+
+
+def post_fork(server, worker):
+    worker.forked_at = time.monotonic()
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app and warm_templates:
+        compile_templates(worker.log)
+
+    # `kill -PROF <worker pid>` captures a profile, see `apps/common/profiler.py`.
+    from {{ cookiecutter.project_slug }}.apps.common.profiler import install_signal_handler
+
+    install_signal_handler()
+
+    worker.log.info(
+        'Worker %s ready in %.0f ms',
+        worker.pid,
+        (time.monotonic() - worker.forked_at) * 1000,
+    )
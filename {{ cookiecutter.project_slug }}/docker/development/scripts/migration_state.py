@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+Prints the state of migrations: a hash of migrations of all installed apps (by
+`MigrationLoader`) and of migrations applied to the database.
+
+`run-development.sh` skips `migrate` when the state is the same as after the
+last run. So it runs when an app is installed, a package brings new
+migrations or the database is new or migrated elsewhere. Exits with an error
+when the database can't be queried.
+"""
+
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[3]
+
+
+def get_state():
+    import django
+    from django.db import connection
+    from django.db.migrations.loader import MigrationLoader
+
+    django.setup()
+    loader = MigrationLoader(connection, ignore_no_migrations=True)
+
+    digest = hashlib.sha256()
+    for migrations in (loader.disk_migrations, loader.applied_migrations):
+        for app_label, name in sorted(migrations):
+            digest.update(f'{app_label}.{name}\n'.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+if __name__ == '__main__':
+    import environ
+
+    sys.path.insert(0, str(APP_DIR))
+    environ.Env.read_env(str(APP_DIR / '.env'))
+    # The same apps as for `manage.py migrate`.
+    os.environ.setdefault('DJANGO_COMMAND_APPS', '1')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', '{{ cookiecutter.project_slug }}.settings.local')
+
+    from django.db import DatabaseError
+
+    try:
+        state = get_state()
+    except DatabaseError as e:
+        sys.exit(f'Unknown state of migrations: {e}')
+
+    print(state)
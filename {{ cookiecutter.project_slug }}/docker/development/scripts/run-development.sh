@@ -2,9 +2,64 @@
 
 set -e
 
-MANAGE_PY=/app/manage.py
-REQUIREMENTS=/app/requirements/local.txt
+APP_DIR=/app
+MANAGE_PY=$APP_DIR/manage.py
+REQUIREMENTS=$APP_DIR/requirements/local.txt
+SCRIPTS_DIR=$APP_DIR/docker/development/scripts
 
-pip3 install -r $REQUIREMENTS
-$MANAGE_PY migrate
-$MANAGE_PY runserver 0.0.0.0:8000
+# Python of the image, the virtualenv (the `venv` volume) is first on PATH.
+BASE_PYTHON=/usr/local/bin/python3
+VENV=${VIRTUAL_ENV:-/venv}
+PYTHON_STAMP=$VENV/.python-version
+REQUIREMENTS_STAMP=$VENV/.requirements.sha256
+MIGRATIONS_STAMP=$VENV/.migrations-state
+
+# Seconds since boot, BusyBox `date` has no sub-second precision.
+now() {
+    cut -d ' ' -f 1 /proc/uptime
+}
+
+elapsed() {
+    awk "BEGIN { printf \"%.2f\", $(now) - $1 }"
+}
+
+STARTED_AT=$(now)
+
+# A virtualenv of another Python version can't be reused.
+PYTHON_VERSION=$($BASE_PYTHON --version)
+if [ "$(cat $PYTHON_STAMP 2>/dev/null)" != "$PYTHON_VERSION" ]; then
+    find $VENV -mindepth 1 -delete
+    $BASE_PYTHON -m venv $VENV
+    echo "$PYTHON_VERSION" > $PYTHON_STAMP
+fi
+
+# Requirements are installed only when requirements/*.txt changed.
+STEP_AT=$(now)
+REQUIREMENTS_HASH=$( (echo "$PYTHON_VERSION"; cat $APP_DIR/requirements/*.txt) | sha256sum | cut -d ' ' -f 1)
+if [ "$(cat $REQUIREMENTS_STAMP 2>/dev/null)" != "$REQUIREMENTS_HASH" ]; then
+    $VENV/bin/pip install -r $REQUIREMENTS
+    echo "$REQUIREMENTS_HASH" > $REQUIREMENTS_STAMP
+    REQUIREMENTS_STATUS=installed
+else
+    REQUIREMENTS_STATUS=unchanged
+fi
+REQUIREMENTS_TIME=$(elapsed $STEP_AT)
+
+# Migrations run only when migrations of installed apps (including ones of new
+# packages) or the database changed since the last run, see `migration_state.py`.
+STEP_AT=$(now)
+MIGRATIONS_STATE=$(python $SCRIPTS_DIR/migration_state.py 2>/dev/null || true)
+if [ -n "$MIGRATIONS_STATE" ] && [ "$MIGRATIONS_STATE" = "$(cat $MIGRATIONS_STAMP 2>/dev/null)" ]; then
+    MIGRATIONS_STATUS=unchanged
+else
+    $MANAGE_PY migrate
+    python $SCRIPTS_DIR/migration_state.py > $MIGRATIONS_STAMP || rm -f $MIGRATIONS_STAMP
+    MIGRATIONS_STATUS=applied
+fi
+MIGRATIONS_TIME=$(elapsed $STEP_AT)
+
+echo "Startup in $(elapsed $STARTED_AT) s:" \
+    "requirements $REQUIREMENTS_TIME s ($REQUIREMENTS_STATUS)," \
+    "migrations $MIGRATIONS_TIME s ($MIGRATIONS_STATUS)"
+
+exec $MANAGE_PY runserver 0.0.0.0:8000
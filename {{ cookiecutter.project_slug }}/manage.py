@@ -6,6 +6,8 @@ if __name__ == "__main__":
     import environ
     environ.Env.read_env()
 
+    # Commands get `COMMAND_APPS` (see settings), web workers don't.
+    os.environ.setdefault("DJANGO_COMMAND_APPS", "1")
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "{{ cookiecutter.project_slug }}.settings.local")
     try:
         from django.core.management import execute_from_command_line
@@ -1,8 +1,38 @@
 import { defineConfig } from '@rsbuild/core';
-import HtmlRspackPlugin from 'html-rspack-plugin';
 import { pluginVue } from '@rsbuild/plugin-vue';
 import { pluginSass } from '@rsbuild/plugin-sass';
 
+// Writes `assets-manifest.json` listing JS and CSS URLs of every entry point.
+// Django loads it once per worker (see `apps/common/assets.py`).
+class AssetManifestPlugin {
+  apply(compiler) {
+    const { Compilation, sources } = compiler.webpack;
+
+    compiler.hooks.thisCompilation.tap('AssetManifestPlugin', compilation => {
+      compilation.hooks.processAssets.tap(
+        { name: 'AssetManifestPlugin', stage: Compilation.PROCESS_ASSETS_STAGE_REPORT },
+        () => {
+          const publicPath = compilation.outputOptions.publicPath || '';
+          const manifest = {};
+
+          for (const [entryName, entrypoint] of compilation.entrypoints) {
+            const files = entrypoint.getFiles();
+            manifest[entryName] = {
+              js: files.filter(file => file.endsWith('.js')).map(file => publicPath + file),
+              css: files.filter(file => file.endsWith('.css')).map(file => publicPath + file),
+            };
+          }
+
+          compilation.emitAsset(
+            'assets-manifest.json',
+            new sources.RawSource(JSON.stringify(manifest, null, 2))
+          );
+        }
+      );
+    });
+  }
+}
+
 export default defineConfig({
   plugins: [pluginVue(), pluginSass()],
 
@@ -38,34 +68,8 @@ export default defineConfig({
         plugin => plugin.constructor.name !== 'HtmlRspackPlugin'
       );
 
-      // Generate separate JS and CSS tag files for each entry point
-      const entryPoints = ['app', 'hello_world_mount'];
-
-      entryPoints.forEach(entryName => {
-        config.plugins.push(
-          new HtmlRspackPlugin({
-            inject: false,
-            filename: `${entryName}-css-tags.html`,
-            chunks: [entryName],
-            templateContent: ({ htmlWebpackPlugin }) => {
-              const { css = [] } = htmlWebpackPlugin.files;
-              return css.map(href => `<link rel="stylesheet" href="${href}">`).join('\n');
-            },
-          })
-        );
-
-        config.plugins.push(
-          new HtmlRspackPlugin({
-            inject: false,
-            filename: `${entryName}-js-tags.html`,
-            chunks: [entryName],
-            templateContent: ({ htmlWebpackPlugin }) => {
-              const { js = [] } = htmlWebpackPlugin.files;
-              return js.map(src => `<script defer src="${src}"></script>`).join('\n');
-            },
-          })
-        );
-      });
+      // Generate a single asset manifest for all entry points
+      config.plugins.push(new AssetManifestPlugin());
 
       return config;
     },
@@ -1,5 +1,36 @@
 from django.contrib import admin
-from django.contrib.auth.admin import UserAdmin
-from .models import User
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.utils import timezone
+from .admin_pagination import LargeTableAdminMixin
+from .models import QueuedEmail, User
 
-admin.site.register(User, UserAdmin)
+
+@admin.register(User)
+class UserAdmin(LargeTableAdminMixin, BaseUserAdmin):
+    # Searches of `search_fields` are served by trigram indexes on PostgreSQL
+    # (migration 0003), other columns are not loaded.
+    list_only = BaseUserAdmin.list_display
+    search_help_text = 'Parts of username, first or last name, or email.'
+
+
+@admin.register(QueuedEmail)
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'next_attempt_at')
+    list_filter = ('status',)
+    search_fields = ('subject',)
+    fields = (
+        'subject', 'from_email', 'recipients', 'status', 'attempts',
+        'next_attempt_at', 'last_error', 'created_at',
+    )
+    readonly_fields = fields
+    actions = ('retry',)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Send selected emails again')
+    def retry(self, request, queryset):
+        count = queryset.update(
+            status=QueuedEmail.QUEUED, attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f'{count} emails queued.')
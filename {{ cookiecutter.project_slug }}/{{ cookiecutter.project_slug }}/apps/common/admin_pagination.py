@@ -0,0 +1,179 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+
+# Query string parameter with the primary key of the last row of the previous page.
+KEYSET_VAR = 'after'
+
+
+def estimate_count(queryset):
+    """Returns the PostgreSQL planner's estimate of rows of a queryset.
+
+    An unfiltered queryset is estimated with `reltuples` of its table, kept
+    up to date by autovacuum, a filtered one with the row estimate of its
+    query plan. Neither reads the rows.
+
+    Returns:
+        Number of rows, or None if the table was never analyzed.
+    """
+    query = queryset.query
+    connection = connections[queryset.db]
+
+    with connection.cursor() as cursor:
+        if not query.where and not query.distinct and not query.combinator:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+            # -1 (or 0 before PostgreSQL 14) until the first VACUUM or ANALYZE.
+            return int(row[0]) if row and row[0] > 0 else None
+
+        sql, params = queryset.order_by().query.get_compiler(queryset.db).as_sql()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator using estimated counts of large PostgreSQL querysets.
+
+    Counts estimated below ADMIN_ESTIMATED_COUNT_THRESHOLD rows, where an
+    exact `COUNT(*)` is cheap, and counts on other databases are exact.
+    `estimated` tells which one was used.
+    """
+
+    estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if connections[queryset.db].vendor == 'postgresql':
+            estimate = estimate_count(queryset)
+            threshold = settings.ADMIN_ESTIMATED_COUNT_THRESHOLD
+            if estimate is not None and estimate >= threshold:
+                self.estimated = True
+                return estimate
+        return super().count
+
+
+class KeysetChangeList(ChangeList):
+    """ChangeList paging through large results by keyset instead of OFFSET.
+
+    An OFFSET page reads and skips all rows before it. From
+    ADMIN_ESTIMATED_COUNT_THRESHOLD results on, a page links to the next one
+    with the primary key of its last row (`?after=`), and the next page is
+    selected with a condition on the ordering fields, which an index on
+    them serves like the first page. Orderings by nullable or related
+    fields use page numbers.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.keyset_after = request.GET.get(KEYSET_VAR)
+        super().__init__(request, *args, **kwargs)
+        # Sorting, filtering and searching start from the first page.
+        self.params.pop(KEYSET_VAR, None)
+        self.filter_params.pop(KEYSET_VAR, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(KEYSET_VAR, None)
+        return lookup_params
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if self.model_admin.list_only is not None:
+            queryset = queryset.only(*self.model_admin.list_only)
+        return queryset
+
+    def get_results(self, request):
+        super().get_results(request)
+        self.keyset_fields = self.get_keyset_fields()
+        self.keyset = (
+            self.keyset_fields is not None
+            and self.multi_page
+            and self.result_count >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD
+        )
+        if self.keyset and self.keyset_after is not None:
+            self.result_list = self.queryset.filter(
+                self.get_keyset_filter(self.keyset_after)
+            )[:self.list_per_page]
+
+    def get_keyset_fields(self):
+        """Returns the ordering of results if rows can be selected by it, or None."""
+        fields = []
+        for name in self.queryset.query.order_by:
+            if not isinstance(name, str):
+                return None
+            field_name = name.removeprefix('-')
+            try:
+                field = (
+                    self.lookup_opts.pk if field_name == 'pk'
+                    else self.lookup_opts.get_field(field_name)
+                )
+            except FieldDoesNotExist:
+                return None
+            # NULLs can't be compared, rows ordered by a relation by its ordering.
+            if not field.concrete or field.null or field.is_relation:
+                return None
+            fields.append(name)
+        # The ordering ends with a unique field (see `_get_deterministic_ordering`).
+        return fields
+
+    def get_keyset_filter(self, pk):
+        """Returns a Q of rows after the row with the given primary key.
+
+        For ordering (a, -b) that's `a > a0 OR (a = a0 AND b < b0)`.
+        """
+        names = [name.removeprefix('-') for name in self.keyset_fields]
+        try:
+            values = self.model._default_manager.values(*names).get(pk=pk)
+        except (self.model.DoesNotExist, ValidationError, ValueError):
+            raise IncorrectLookupParameters
+
+        condition = Q()
+        equal = {}
+        for name in self.keyset_fields:
+            field_name = name.removeprefix('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{field_name}__{lookup}': values[field_name]})
+            equal[field_name] = values[field_name]
+        return condition
+
+    @property
+    def keyset_next_url(self):
+        """Returns the query string of the next page, None on the last one."""
+        results = list(self.result_list)
+        if len(results) < self.list_per_page:
+            return None
+        return self.get_query_string({KEYSET_VAR: results[-1].pk})
+
+
+class LargeTableAdminMixin:
+    """ModelAdmin options for changelists of millions of rows.
+
+    Results are counted once, estimated by PostgreSQL when there are many,
+    without the unfiltered total and facet counts, and paged by keyset.
+    Set `list_only` to the fields shown, so only those are loaded.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    # Fields loaded for the changelist, None loads all of them.
+    list_only = None
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
@@ -3,3 +3,29 @@ from django.apps import AppConfig
 
 class CommonConfig(AppConfig):
     name = '{{ cookiecutter.project_slug }}.apps.common'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from django.contrib.auth.signals import user_logged_in
+
+        # Connect signal receivers of GDPR settings and permission caching.
+        from . import permissions, utils  # noqa: F401
+        from .backends import update_last_login
+
+        # Replaces Django's receiver, connected with the same dispatch_uid, so
+        # whichever app is ready first, only one of them stays connected.
+        user_logged_in.disconnect(dispatch_uid='update_last_login')
+        user_logged_in.connect(update_last_login, dispatch_uid='update_last_login')
+
+        # Count database queries of requests sampled by ServerTimingMiddleware.
+        from .timing import install_execute_wrapper
+
+        connection_created.connect(
+            install_execute_wrapper, dispatch_uid='install_execute_wrapper'
+        )
+
+        # Load the asset manifest once per process, before the first request.
+        from .assets import registry
+
+        registry.load()
@@ -0,0 +1,202 @@
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.html import format_html
+
+from .timing import current_metrics
+
+# Name of the manifest emitted by rsbuild (see `rsbuild.config.mjs`).
+# Structure: {entry_point: {'js': [url, ...], 'css': [url, ...]}}
+MANIFEST_FILENAME = "assets-manifest.json"
+
+# In DEBUG mode the manifest is checked for changes at most this often (seconds).
+DEBUG_CHECK_INTERVAL = 1.0
+
+TAG_TEMPLATES = {
+    "css": '<link rel="stylesheet" href="{}">',
+    "js": '<script defer src="{}"></script>',
+}
+
+# `Link` header values announcing the same assets. Entry points are rendered
+# as classic `defer` scripts, so they are preloaded `as=script`; a
+# `modulepreload` would be fetched in CORS mode and not reused by the tag.
+PRELOAD_TEMPLATES = {
+    "css": "<{}>; rel=preload; as=style",
+    "js": "<{}>; rel=preload; as=script",
+}
+
+
+def get_potential_staticfile_paths(filename):
+    """Yields potential paths for a static file.
+
+    Args:
+        filename - Name of the file to search for
+    Yields:
+        Path objects to check, in order of preference
+    """
+
+    # First check STATIC_ROOT (production)
+    if hasattr(settings, "STATIC_ROOT") and settings.STATIC_ROOT:
+        yield Path(settings.STATIC_ROOT) / filename
+
+    # Then check all STATICFILES_DIRS (development)
+    if hasattr(settings, "STATICFILES_DIRS") and settings.STATICFILES_DIRS:
+        for static_dir in settings.STATICFILES_DIRS:
+            yield Path(static_dir) / filename
+
+
+def render_tags(file_type, urls):
+    """Renders HTML tags of a given type for a list of asset URLs."""
+    return "\n".join(format_html(TAG_TEMPLATES[file_type], url) for url in urls)
+
+
+def render_preload_links(file_type, urls):
+    """Renders `Link` header values of a given type for a list of asset URLs."""
+    return tuple(PRELOAD_TEMPLATES[file_type].format(url) for url in urls)
+
+
+def record_entry_point(request, entry_point, file_type):
+    """Remembers that the response to `request` uses assets of an entry point.
+
+    Used by `AssetPreloadMiddleware` to announce the assets in `Link` headers.
+    """
+    if request is None:
+        return
+
+    # A dict keeps insertion order and drops duplicates.
+    request.__dict__.setdefault("asset_entry_points", {})[
+        (entry_point, file_type)
+    ] = None
+
+
+def get_preload_links(request):
+    """Returns `Link` header values for entry points recorded on `request`."""
+    entry_points = getattr(request, "asset_entry_points", None)
+    if not entry_points:
+        return ()
+
+    return tuple(
+        link
+        for entry_point, file_type in entry_points
+        for link in registry.get_preload_links(entry_point, file_type)
+    )
+
+
+class AssetRegistry:
+    """In-memory map of entry points to their CSS and JS tags.
+
+    The whole manifest is read once (at app startup, see `CommonConfig.ready`)
+    and tags are rendered up front, so a lookup is a dictionary access with
+    no filesystem calls. In DEBUG mode only the manifest itself is watched:
+    its mtime is re-checked at most once per `DEBUG_CHECK_INTERVAL` and the
+    registry is reloaded when it changes.
+    """
+
+    def __init__(self, filename=MANIFEST_FILENAME):
+        self.filename = filename
+        self.entries = {}
+        self.preload_links = {}
+        self.path = None
+        self.mtime = None
+        self.loaded = False
+        self.checked_at = 0.0
+
+    def find_manifest(self):
+        """Returns the path of the first existing manifest or None."""
+        return next(
+            (
+                path
+                for path in get_potential_staticfile_paths(self.filename)
+                if path.exists()
+            ),
+            None,
+        )
+
+    def load(self):
+        """Reads the manifest and replaces the in-memory map.
+
+        A missing or malformed manifest results in an empty registry.
+        """
+        path = self.find_manifest()
+        manifest, mtime = {}, None
+
+        if path is not None:
+            try:
+                mtime = path.stat().st_mtime
+                manifest = json.loads(path.read_text())
+            except (OSError, ValueError):
+                manifest = {}
+
+        # Build the new map first and swap it in, so concurrent readers
+        # never see a half-loaded registry.
+        self.entries = {
+            entry_point: {
+                file_type: render_tags(file_type, files.get(file_type, []))
+                for file_type in TAG_TEMPLATES
+            }
+            for entry_point, files in manifest.items()
+        }
+        self.preload_links = {
+            entry_point: {
+                file_type: render_preload_links(file_type, files.get(file_type, []))
+                for file_type in PRELOAD_TEMPLATES
+            }
+            for entry_point, files in manifest.items()
+        }
+        self.path = path
+        self.mtime = mtime
+        self.loaded = True
+        self.checked_at = time.monotonic()
+
+    def is_stale(self):
+        """Returns True if the manifest changed since it was loaded."""
+        now = time.monotonic()
+        if now - self.checked_at < DEBUG_CHECK_INTERVAL:
+            return False
+        self.checked_at = now
+
+        path = self.path or self.find_manifest()
+        if path is None:
+            return False
+
+        try:
+            return path.stat().st_mtime != self.mtime
+        except OSError:
+            return True
+
+    def get(self, entry_point, file_type):
+        """Returns HTML tags for an entry point.
+
+        Args:
+            entry_point - Name of the entry point (e.g., 'app', 'hello_world_mount')
+            file_type - Type of tags ('css' or 'js')
+        Returns:
+            HTML tags for the entry point or empty string if it is unknown.
+        """
+        if not self.loaded or (settings.DEBUG and self.is_stale()):
+            self.load()
+
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.asset_lookups += 1
+
+        return self.entries.get(entry_point, {}).get(file_type, "")
+
+    def get_preload_links(self, entry_point, file_type):
+        """Returns `Link` header values for an entry point.
+
+        Args:
+            entry_point - Name of the entry point (e.g., 'app', 'hello_world_mount')
+            file_type - Type of assets ('css' or 'js')
+        Returns:
+            Tuple of `Link` header values, empty if the entry point is unknown.
+        """
+        if not self.loaded or (settings.DEBUG and self.is_stale()):
+            self.load()
+
+        return self.preload_links.get(entry_point, {}).get(file_type, ())
+
+
+registry = AssetRegistry()
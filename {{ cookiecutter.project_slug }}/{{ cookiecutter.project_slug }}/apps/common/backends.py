@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .permissions import CachedPermissionsMixin
+
+
+class EmailOrUsernameBackend(CachedPermissionsMixin, ModelBackend):
+    """Authenticates users by username or email address, ignoring case.
+
+    Both are compared lowercased, `LOWER(column) = LOWER(%s)`, which the
+    unique indexes on `Lower('username')` and `Lower('email')` of the User
+    model serve. `iexact` compiles to UPPER() on PostgreSQL and wouldn't use
+    them. When a login is the username of one user and the email of
+    another, the username wins. Permissions are cached across requests.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        login = Lower(Value(username))
+        users = list(
+            UserModel._default_manager.annotate(
+                username_lower=Lower('username'), email_lower=Lower('email')
+            ).filter(
+                # The email index is partial, conditions must imply its own.
+                Q(username_lower=login) | (Q(email_lower=login) & ~Q(email=''))
+            )[:2]
+        )
+        if not users:
+            # Run the password hasher to take as long as for existing users.
+            UserModel().set_password(password)
+            return None
+
+        user = min(users, key=lambda user: user.username_lower != username.lower())
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+def update_last_login(sender, user, **kwargs):
+    """Updates `last_login` of a logged in user, unless it's recent.
+
+    Replaces Django's receiver of `user_logged_in` (see `CommonConfig.ready`),
+    which updates the users table on every login. Within
+    LAST_LOGIN_UPDATE_INTERVAL seconds of the stored value, it's kept.
+    """
+    now = timezone.now()
+    interval = timedelta(seconds=settings.LAST_LOGIN_UPDATE_INTERVAL)
+    if user.last_login is not None and now - user.last_login < interval:
+        return
+
+    user.last_login = now
+    user.save(update_fields=['last_login'])
@@ -0,0 +1,341 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+from .timing import current_metrics
+
+# Counter in the shared store bumped for every invalidated key. Stored as a raw
+# integer, so it's incremented atomically.
+GENERATION_KEY = 'tiered-cache:generation'
+# Key invalidated with a generation, read by processes syncing to it.
+INVALIDATED_KEY = 'tiered-cache:invalidated:{}'
+# Seconds invalidated keys are kept, processes syncing later drop whole tiers.
+INVALIDATED_TIMEOUT = 60
+# Processes more invalidated keys behind drop whole tiers instead.
+MAX_INVALIDATED = 100
+
+# Structure: {location: LocalTier}
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class LocalTier:
+    """Bounded LRU of pickled values shared by all threads of a process."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.reset()
+        # A forked worker must not inherit a held lock or the parent's values.
+        os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self):
+        # Structure: {key: (expire_at, pickled value)}
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.generation = None
+        self.synced_at = 0.0
+
+    def get(self, key, now):
+        """Returns the pickled value of a key or None if missing or expired."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, pickled, expire_at):
+        with self.lock:
+            self.entries[key] = (expire_at, pickled)
+            self.entries.move_to_end(key)
+            # Evicting the least recently used entry is O(1), no culling scans.
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class TieredCache(BaseCache):
+    """Per-process LRU cache in front of a shared cache.
+
+    Reads are served from the local tier when possible and fall back to the
+    shared cache (usually `RedisCache`), with found values promoted to the
+    local tier. Promoted values live there for `LOCAL_TIMEOUT` seconds at
+    most and never longer than in the shared cache. Writes go to both tiers;
+    `get_many`/`set_many`/`delete_many` use a single round trip to the
+    shared cache.
+
+    Deleted (and incremented) keys are broadcast through the shared cache:
+    every key bumps a generation counter and is stored under its generation.
+    At most once per `SYNC_INTERVAL` seconds every process checks the
+    counter and drops the keys invalidated since, or its whole local tier
+    when it's more than MAX_INVALIDATED keys or INVALIDATED_TIMEOUT seconds
+    behind, or after `clear`. So a deleted value is served by other
+    processes for at most `SYNC_INTERVAL` seconds, a value overwritten with
+    `set` for at most `LOCAL_TIMEOUT`.
+
+    Values in the shared cache are wrapped with their expiry time, except
+    integers, which are stored as they are, so `incr` is atomic with
+    `RedisCache`. Promoted integers are kept in the local tier for
+    `LOCAL_TIMEOUT` seconds even if they expire sooner.
+
+    The shared cache is created by this backend and isn't registered in
+    `caches`, so tools wrapping registered caches (django-debug-toolbar's
+    cache panel) see only calls of this backend, not its pickled payloads.
+
+    Options:
+        SHARED - Settings of the shared cache, like an entry of CACHES
+            (`BACKEND`, `LOCATION`, `OPTIONS`, `KEY_PREFIX`...).
+        MAX_ENTRIES - Size of the local tier (default 300).
+        LOCAL_TIMEOUT - Seconds a value is kept in the local tier (default 5).
+        SYNC_INTERVAL - Seconds between generation checks (default 1).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        # Created like `CacheHandler.create_connection` does.
+        shared = dict(options['SHARED'])
+        backend = import_string(shared.pop('BACKEND'))
+        self.shared = backend(shared.pop('LOCATION', ''), shared)
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self.sync_interval = options.get('SYNC_INTERVAL', 1)
+
+        with _tiers_lock:
+            if location not in _tiers:
+                _tiers[location] = LocalTier(self._max_entries)
+            self.tier = _tiers[location]
+
+    def resolve_timeout(self, timeout):
+        """Returns timeout in seconds or None for values which never expire."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return timeout
+
+    def local_expire_at(self, expire_at, now):
+        local_expire_at = now + self.local_timeout
+        if expire_at is None:
+            return local_expire_at
+        return min(local_expire_at, expire_at)
+
+    def sync(self, now):
+        """Drops keys invalidated by other processes since last sync."""
+        tier = self.tier
+        shared = self.shared
+        generation = shared.get(GENERATION_KEY)
+        if generation is None:
+            # Starts from the current time, so processes don't take it for a
+            # generation seen before `clear` or an eviction.
+            shared.add(GENERATION_KEY, time.time_ns(), timeout=None)
+            generation = shared.get(GENERATION_KEY)
+        previous = tier.generation
+
+        if generation != previous:
+            if (
+                generation is None
+                or previous is None
+                or not 0 < generation - previous <= MAX_INVALIDATED
+            ):
+                tier.clear()
+            else:
+                names = [
+                    INVALIDATED_KEY.format(number)
+                    for number in range(previous + 1, generation + 1)
+                ]
+                invalidated = shared.get_many(names)
+                if len(invalidated) < len(names):
+                    # Expired, or not stored yet by `broadcast` of another process.
+                    tier.clear()
+                else:
+                    for key in invalidated.values():
+                        tier.delete(key)
+            tier.generation = generation
+
+        tier.synced_at = now
+
+    def broadcast(self, keys):
+        """Makes other processes drop made keys from their local tiers."""
+        shared = self.shared
+        try:
+            generation = shared.incr(GENERATION_KEY, len(keys))
+        except ValueError:
+            # Missing, started as in `sync`.
+            shared.add(GENERATION_KEY, time.time_ns(), timeout=None)
+            generation = shared.incr(GENERATION_KEY, len(keys))
+
+        first = generation - len(keys) + 1
+        shared.set_many(
+            {INVALIDATED_KEY.format(first + i): key for i, key in enumerate(keys)},
+            INVALIDATED_TIMEOUT,
+        )
+
+    def lookup(self, keys, now):
+        """Returns pickled values of made keys found in either tier.
+
+        Args:
+            keys - Keys made with `make_and_validate_key`.
+            now - Current time.
+        Returns:
+            Dictionary of {key: pickled value}.
+        """
+        tier = self.tier
+        if now - tier.synced_at >= self.sync_interval:
+            self.sync(now)
+
+        found = {}
+        missing = []
+        for key in keys:
+            pickled = tier.get(key, now)
+            if pickled is None:
+                missing.append(key)
+            else:
+                found[key] = pickled
+
+        if missing:
+            started_at = time.perf_counter()
+            for key, value in self.shared.get_many(missing).items():
+                if type(value) is int:
+                    # Stored as it is by `wrap`.
+                    expire_at = None
+                    pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+                else:
+                    expire_at, pickled = value
+                    if expire_at is not None and expire_at <= now:
+                        continue
+                tier.set(key, pickled, self.local_expire_at(expire_at, now))
+                found[key] = pickled
+
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.cache_hits += len(found)
+            metrics.cache_misses += len(keys) - len(found)
+            if missing:
+                metrics.cache_time += time.perf_counter() - started_at
+
+        return found
+
+    def wrap(self, value, expire_at):
+        """Returns a value as stored in the shared cache and its pickled form."""
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if type(value) is int:
+            return value, pickled
+        return (expire_at, pickled), pickled
+
+    def store(self, values, timeout):
+        """Writes values of made keys to both tiers.
+
+        Args:
+            values - Dictionary of {key: value}.
+            timeout - Timeout in seconds or None.
+        """
+        now = time.time()
+        expire_at = None if timeout is None else now + timeout
+        # Structure: {key: (shared value, pickled value)}
+        wrapped = {key: self.wrap(value, expire_at) for key, value in values.items()}
+
+        self.shared.set_many(
+            {key: shared for key, (shared, _) in wrapped.items()}, timeout
+        )
+
+        for key, (_, pickled) in wrapped.items():
+            if timeout is None or timeout > 0:
+                self.tier.set(key, pickled, self.local_expire_at(expire_at, now))
+            else:
+                self.tier.delete(key)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        pickled = self.lookup([key], time.time()).get(key)
+        if pickled is None:
+            return default
+        return pickle.loads(pickled)
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        found = self.lookup(keys, time.time())
+        return {keys[key]: pickle.loads(pickled) for key, pickled in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self.store({key: value}, self.resolve_timeout(timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        values = {
+            self.make_and_validate_key(key, version=version): value
+            for key, value in data.items()
+        }
+        self.store(values, self.resolve_timeout(timeout))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self.resolve_timeout(timeout)
+        now = time.time()
+        expire_at = None if timeout is None else now + timeout
+        shared, pickled = self.wrap(value, expire_at)
+
+        if not self.shared.add(key, shared, timeout):
+            return False
+
+        if timeout is None or timeout > 0:
+            self.tier.set(key, pickled, self.local_expire_at(expire_at, now))
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        pickled = self.lookup([key], time.time()).get(key)
+        if pickled is None:
+            return False
+        self.store({key: pickle.loads(pickled)}, self.resolve_timeout(timeout))
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        made_key = self.make_and_validate_key(key, version=version)
+        try:
+            value = self.shared.incr(made_key, delta)
+        except ValueError:
+            raise ValueError("Key '%s' not found." % key)
+
+        # Other processes may hold the previous value, the own tier the new one.
+        self.broadcast([made_key])
+        self.tier.set(
+            made_key,
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+            self.local_expire_at(None, time.time()),
+        )
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        deleted = self.shared.delete(key)
+        self.tier.delete(key)
+        self.broadcast([key])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if not keys:
+            return
+        self.shared.delete_many(keys)
+        for key in keys:
+            self.tier.delete(key)
+        self.broadcast(keys)
+
+    def clear(self):
+        # Also clears the generation, so other processes drop their local tiers.
+        self.shared.clear()
+        self.tier.clear()
@@ -0,0 +1,137 @@
+from functools import cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# Cookie values, the same as in `assets/components/gdpr/gdpr_settings.js`.
+ACCEPT_VALUE = 'accepted'
+FALSE_VALUE = 'false'
+
+# Consent cookies expire time (seconds), the same as `expired_at` in JS.
+CONSENT_MAX_AGE = 1000
+
+
+@cache
+def get_consent_bits():
+    """Returns a map of consent cookie names to their bit flags.
+
+    Built once from `GDPR_CONSENT_CATEGORIES`, reset when the setting changes.
+    """
+    return {
+        name: 1 << index
+        for index, name in enumerate(settings.GDPR_CONSENT_CATEGORIES)
+    }
+
+
+@receiver(setting_changed)
+def reset_consent_bits(setting, **kwargs):
+    if setting == 'GDPR_CONSENT_CATEGORIES':
+        get_consent_bits.cache_clear()
+
+
+class Consent:
+    """Consent state of a single request.
+
+    Every category from `GDPR_CONSENT_CATEGORIES` is a bit in two integers:
+    `given` (the user made a decision) and `accepted`, so checks are
+    O(1) bit tests. Categories are named after their cookies (for example
+    `gdpr-analytics`), names outside of the setting fall back to a plain
+    cookie lookup.
+
+    With `GDPR_CONSENT_COOKIE` enabled, the state is read from that single
+    cookie (written by `save` and the Vue GDPR module), and per-category
+    cookies present too override their own bits, as they're newer (written
+    e.g. by `setAcceptedConsent` of the Vue module). Without it, the state is
+    read from per-category cookies only. The packed cookie isn't signed,
+    consent cookies are set by the client anyway.
+    """
+
+    __slots__ = ('given', 'accepted', 'cookies')
+
+    def __init__(self, given=0, accepted=0, cookies=None):
+        self.given = given
+        self.accepted = accepted
+        self.cookies = cookies if cookies is not None else {}
+
+    @classmethod
+    def from_request(cls, request):
+        """Parses consent of all categories from request cookies."""
+        cookies = request.COOKIES
+        consent = None
+        packed_cookie = getattr(settings, 'GDPR_CONSENT_COOKIE', None)
+        if packed_cookie and packed_cookie in cookies:
+            consent = cls.unpack(cookies[packed_cookie], cookies)
+        if consent is None:
+            consent = cls(cookies=cookies)
+
+        for name, bit in get_consent_bits().items():
+            value = cookies.get(name)
+            if value is not None:
+                consent.given |= bit
+                if value == ACCEPT_VALUE:
+                    consent.accepted |= bit
+                else:
+                    consent.accepted &= ~bit
+
+        return consent
+
+    @classmethod
+    def unpack(cls, value, cookies=None):
+        """Returns Consent from a packed value or None if it is malformed."""
+        given, _, accepted = value.partition('.')
+        try:
+            given, accepted = int(given, 16), int(accepted, 16)
+        except ValueError:
+            return None
+        if given < 0 or accepted < 0:
+            return None
+        return cls(given, accepted & given, cookies)
+
+    def pack(self):
+        """Returns consent state packed into a short string."""
+        return f'{self.given:x}.{self.accepted:x}'
+
+    def has(self, name):
+        """Returns True if the user decided about a category."""
+        bit = get_consent_bits().get(name)
+        if bit is None:
+            return name in self.cookies
+        return bool(self.given & bit)
+
+    def is_accepted(self, name):
+        """Returns True if the user accepted a category."""
+        bit = get_consent_bits().get(name)
+        if bit is None:
+            return self.cookies.get(name) == ACCEPT_VALUE
+        return bool(self.accepted & bit)
+
+    def set(self, name, accepted=True):
+        """Records a decision about a category from `GDPR_CONSENT_CATEGORIES`."""
+        bit = get_consent_bits()[name]
+        self.given |= bit
+        if accepted:
+            self.accepted |= bit
+        else:
+            self.accepted &= ~bit
+
+    def save(self, response):
+        """Writes consent state to response cookies.
+
+        Writes a single cookie if `GDPR_CONSENT_COOKIE` is enabled and deletes
+        per-category cookies of the request, which would override it,
+        per-category cookies otherwise.
+        """
+        packed_cookie = getattr(settings, 'GDPR_CONSENT_COOKIE', None)
+
+        if packed_cookie:
+            response.set_cookie(packed_cookie, self.pack(), max_age=CONSENT_MAX_AGE)
+            for name in get_consent_bits():
+                if name in self.cookies:
+                    response.delete_cookie(name)
+            return
+
+        for name, bit in get_consent_bits().items():
+            if self.given & bit:
+                value = ACCEPT_VALUE if self.accepted & bit else FALSE_VALUE
+                response.set_cookie(name, value, max_age=CONSENT_MAX_AGE)
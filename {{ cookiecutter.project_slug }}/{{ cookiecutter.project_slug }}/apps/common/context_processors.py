@@ -1,11 +1,14 @@
-import json
+from django.utils.functional import lazy
+from django.utils.safestring import SafeString
 
-from django.conf import settings
-from django.utils.html import mark_safe
+from .utils import get_gdpr_payload
+
+# Evaluated only by templates which use it, the payload itself is cached.
+GDPR_SETTINGS = lazy(lambda: get_gdpr_payload().json, SafeString)()
 
 
 def gdpr(request):
     """Attach GDPR settings to global context."""
     return {
-        'GDPR_SETTINGS': mark_safe(json.dumps(settings.GDPR_SETTINGS)),
+        'GDPR_SETTINGS': GDPR_SETTINGS,
     }
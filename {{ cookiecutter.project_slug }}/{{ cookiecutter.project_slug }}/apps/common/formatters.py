@@ -1,30 +1,128 @@
+from django.http.request import RawPostDataException
 from pythonjsonlogger import jsonlogger
 
+# Bodies of other content types (e.g. multipart uploads) are never logged.
+BODY_CONTENT_TYPES = ('application/json', 'application/x-www-form-urlencoded')
+
+DEFAULT_HEADER_DENYLIST = ('Authorization', 'Cookie', 'Proxy-Authorization', 'X-Csrftoken')
+
+
+def truncate(value, limit):
+    """Returns value cut to `limit` characters, marked if it was cut."""
+    if len(value) <= limit:
+        return value
+    return value[:limit] + '...'
+
 
 class DjangoRequestJsonFormatter(jsonlogger.JsonFormatter):
     """
     This class is used to serialize headers and body of the JSON Django request
     into the `request` property in the record of `jsonlogger.JsonFormatter`.
+
+    The log record is not modified (other handlers, like `AdminEmailHandler`,
+    still get the request object) and the request is read only when a handler
+    formats the record. Logged headers are filtered by `header_allowlist`
+    (all if None) and `header_denylist`, and cut to `max_header_size`.
+    Bodies of JSON and form requests are cut to `max_body_size`; a body the
+    view did not read is read only if its Content-Length is within that
+    limit, so uploads and streamed requests are never consumed here.
+    Metrics of requests sampled by `ServerTimingMiddleware` are added as
+    `timing`.
+
+    `BoundedQueueHandler` calls `get_request_fields` in the thread which
+    logged the record and replaces the request with its result, so the
+    request is never read by the listener thread; those fields are logged
+    like other extra fields of the record.
+
+    Options are passed as formatter arguments, see `LOGGING` in `settings/dist.py`.
     """
 
+    def __init__(
+        self,
+        *args,
+        max_body_size=2048,
+        max_header_size=256,
+        header_allowlist=None,
+        header_denylist=DEFAULT_HEADER_DENYLIST,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.max_body_size = max_body_size
+        self.max_header_size = max_header_size
+        self.header_allowlist = (
+            {name.lower() for name in header_allowlist}
+            if header_allowlist is not None
+            else None
+        )
+        self.header_denylist = {name.lower() for name in header_denylist}
+
     def add_fields(self, log_record, record, message_dict):
-        if getattr(record, 'request', None):
-            def is_django_request(request):
-                return getattr(record.request, 'method', None)
+        super().add_fields(log_record, record, message_dict)
 
-            def has_correct_content_type(request):
-                CONTENT_TYPES = ['application/json', 'application/x-www-form-urlencoded']
-                return record.request.META.get('CONTENT_TYPE', None) in CONTENT_TYPES
+        log_record.update(self.get_request_fields(getattr(record, 'request', None)))
 
-            if is_django_request(record.request):
-                has_correct_content_type = has_correct_content_type(record.request)
+    def get_request_fields(self, request):
+        """Returns log fields of a request: `request` and, if sampled, `timing`.
 
-                record.request = {
-                    'request': record.request,
-                    'headers': record.request.headers
-                }
+        Returns an empty dictionary for anything but an HttpRequest.
+        """
+        # `django.server` logs a socket as `request`, only HttpRequest has method.
+        if not getattr(request, 'method', None):
+            return {}
 
-                if has_correct_content_type:
-                    record.request['body'] = record.request['request'].body.decode('UTF-8')
+        fields = {'request': self.serialize_request(request)}
+        # Set on requests sampled by `ServerTimingMiddleware`.
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            fields['timing'] = metrics.as_dict()
+        return fields
 
-        super().add_fields(log_record, record, message_dict)
+    def serialize_request(self, request):
+        data = {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'headers': self.serialize_headers(request),
+        }
+
+        content_type = request.META.get('CONTENT_TYPE', '').split(';')[0].strip()
+        if content_type in BODY_CONTENT_TYPES:
+            data['body'] = self.serialize_body(request)
+
+        return data
+
+    def serialize_headers(self, request):
+        headers = {}
+
+        for name, value in request.headers.items():
+            key = name.lower()
+            if key in self.header_denylist:
+                continue
+            if self.header_allowlist is not None and key not in self.header_allowlist:
+                continue
+            headers[name] = truncate(value, self.max_header_size)
+
+        return headers
+
+    def serialize_body(self, request):
+        # Use the body read by the view, if any, instead of touching the stream.
+        body = getattr(request, '_body', None)
+
+        if body is None:
+            try:
+                length = int(request.META.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                length = 0
+
+            if not 0 < length <= self.max_body_size:
+                return None
+
+            # The view may have consumed the stream through `request.POST`.
+            try:
+                body = request.body
+            except (RawPostDataException, OSError, ValueError):
+                return None
+
+        return truncate(
+            body[: self.max_body_size + 1].decode('UTF-8', errors='replace'),
+            self.max_body_size,
+        )
@@ -0,0 +1,144 @@
+import copy
+import logging
+import os
+import queue
+import weakref
+from logging.handlers import QueueHandler, QueueListener
+
+# Handlers of the process, whose queues are replaced in forked children.
+_handlers = weakref.WeakSet()
+
+
+class FlushingQueueListener(QueueListener):
+    """Queue listener which can be stopped while its bounded queue is full."""
+
+    def enqueue_sentinel(self):
+        # Wait for room instead of `put_nowait`, the listener thread drains
+        # the queue, so records logged before `stop()` are all written.
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        super().stop()
+        for handler in self.handlers:
+            handler.flush()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Moves formatting and writing of log records off the request thread.
+
+    Records are put on a bounded queue and handled by the handlers of a
+    `FlushingQueueListener` in a background thread. When the queue is full
+    records are dropped and counted; the count is logged as a warning once
+    there is room again.
+
+    The listener starts on the first record of each process: threads don't
+    survive `fork()`, so a gunicorn worker forked from a preloaded master
+    gets a fresh queue and listener. It is stopped and flushed on exit (by
+    `logging.shutdown`, which closes handlers).
+
+    The request of a record is read in the thread which logged it: it's
+    replaced with fields from `get_request_fields` of the first listener
+    handler's formatter which has it (`DjangoRequestJsonFormatter`), or
+    dropped. The listener thread runs after the response was sent, when
+    the request and its input stream may be in use by another request.
+
+    Configured with `dictConfig` (Python 3.12+), see `LOGGING` in
+    `settings/dist.py`, which creates the queue and the listener.
+    """
+
+    def __init__(self, record_queue, **kwargs):
+        super().__init__(record_queue, **kwargs)
+        self.listener = None
+        self.dropped = 0
+        self.started_pid = None
+        _handlers.add(self)
+
+    def after_fork(self):
+        """Replaces queue and listener state inherited from the parent."""
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        if self.listener is not None:
+            self.listener = type(self.listener)(
+                self.queue,
+                *self.listener.handlers,
+                respect_handler_level=self.listener.respect_handler_level,
+            )
+        self.started_pid = None
+
+    def start(self):
+        if self.listener is not None and self.started_pid != os.getpid():
+            self.started_pid = os.getpid()
+            self.listener.start()
+
+    def prepare(self, record):
+        # Only the message and the request are serialized here, so later
+        # changes of them don't leak in. Formatting happens in the listener thread.
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+
+        request = record.__dict__.pop('request', None)
+        if request is not None:
+            record.__dict__.update(self.get_request_fields(request))
+        return record
+
+    def get_request_fields(self, request):
+        """Returns log fields of a request from a listener handler's formatter."""
+        handlers = self.listener.handlers if self.listener is not None else ()
+        for handler in handlers:
+            get_fields = getattr(handler.formatter, 'get_request_fields', None)
+            if get_fields is not None:
+                return get_fields(request)
+        return {}
+
+    def enqueue(self, record):
+        # `Handler.handle` holds the handler lock, so counters are safe here.
+        if self.started_pid is None:
+            self.start()
+
+        if self.dropped and self.report_dropped():
+            self.dropped = 0
+
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def dropped_record(self):
+        """Returns a warning record about dropped records."""
+        return self.prepare(
+            logging.LogRecord(
+                name=__name__,
+                level=logging.WARNING,
+                pathname=__file__,
+                lineno=0,
+                msg='Logging queue was full, dropped %d records',
+                args=(self.dropped,),
+                exc_info=None,
+            )
+        )
+
+    def report_dropped(self):
+        """Enqueues a warning about dropped records, returns True on success."""
+        try:
+            self.queue.put_nowait(self.dropped_record())
+        except queue.Full:
+            return False
+        return True
+
+    def close(self):
+        if self.listener is not None and self.started_pid == os.getpid():
+            if self.dropped:
+                self.queue.put(self.dropped_record())
+                self.dropped = 0
+            self.listener.stop()
+            self.started_pid = None
+        super().close()
+
+
+def _after_fork():
+    for handler in list(_handlers):
+        handler.after_fork()
+
+
+# Registered once, handlers of each `dictConfig` run are tracked in `_handlers`.
+os.register_at_fork(after_in_child=_after_fork)
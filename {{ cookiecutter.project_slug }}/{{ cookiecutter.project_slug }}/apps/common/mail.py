@@ -0,0 +1,207 @@
+import logging
+import random
+import smtplib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.backends.smtp import EmailBackend as SMTPBackend
+from django.core.mail.message import sanitize_address
+from django.db import transaction
+from django.utils import timezone
+
+from .models import QueuedEmail
+
+logger = logging.getLogger('apps.email')
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Stores messages in the database instead of sending them.
+
+    A request doesn't wait for the mail relay, messages are delivered by
+    `./manage.py send_queued_email`. Messages sent in a transaction are
+    delivered only if it's committed.
+    """
+
+    def send_messages(self, email_messages):
+        rows = []
+        for message in email_messages:
+            if not message.recipients():
+                continue
+            encoding = message.encoding or settings.DEFAULT_CHARSET
+            rows.append(QueuedEmail(
+                subject=message.subject,
+                from_email=sanitize_address(message.from_email, encoding),
+                recipients=[
+                    sanitize_address(address, encoding) for address in message.recipients()
+                ],
+                message=message.message().as_bytes(linesep='\r\n'),
+            ))
+
+        try:
+            QueuedEmail.objects.bulk_create(rows)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        return len(rows)
+
+
+class RelayUnavailable(Exception):
+    """The mail relay can't be connected to, no message was charged for it."""
+
+
+def is_permanent(error):
+    """Returns whether an error rejects the message for good (5xx replies)."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _message in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+def get_retry_delay(attempts):
+    """Returns seconds before the next attempt, doubled with every attempt."""
+    delay = min(
+        settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.EMAIL_QUEUE_MAX_RETRY_DELAY,
+    )
+    # Messages failed together are not retried together.
+    return delay * random.uniform(0.8, 1.2)
+
+
+class SMTPDelivery:
+    """Sends queued messages over a reused SMTP connection.
+
+    The connection is replaced after `messages_per_connection` messages,
+    as relays limit them, and messages are spaced to stay under
+    `rate_limit` per second.
+
+    Args:
+        messages_per_connection - Messages sent before reconnecting.
+        rate_limit - Messages per second, 0 for no limit.
+    """
+
+    def __init__(self, messages_per_connection=None, rate_limit=None):
+        self.backend = SMTPBackend(fail_silently=False)
+        self.messages_per_connection = (
+            messages_per_connection or settings.EMAIL_QUEUE_MESSAGES_PER_CONNECTION
+        )
+        if rate_limit is None:
+            rate_limit = settings.EMAIL_QUEUE_RATE_LIMIT
+        self.interval = 1 / rate_limit if rate_limit else 0
+        self.next_send_at = 0.0
+        self.sent_on_connection = 0
+
+    def connect(self):
+        if (
+            self.backend.connection is not None
+            and self.sent_on_connection < self.messages_per_connection
+        ):
+            return
+
+        self.close()
+        try:
+            self.backend.open()
+        except (OSError, smtplib.SMTPException) as error:
+            self.close()
+            raise RelayUnavailable(str(error)) from error
+        self.sent_on_connection = 0
+
+    def throttle(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_send_at > now:
+            time.sleep(self.next_send_at - now)
+            now = self.next_send_at
+        self.next_send_at = now + self.interval
+
+    def send(self, email):
+        """Sends a QueuedEmail.
+
+        Returns:
+            Dictionary of {recipient: (code, reply)} the relay refused,
+            other recipients got the message.
+        """
+        self.connect()
+        self.throttle()
+        try:
+            refused = self.backend.connection.sendmail(
+                email.from_email, email.recipients, bytes(email.message)
+            )
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            raise
+        self.sent_on_connection += 1
+        return refused
+
+    def close(self):
+        try:
+            self.backend.close()
+        except (OSError, smtplib.SMTPException):
+            pass  # The connection is dropped anyway.
+
+
+def deliver_batch(delivery, batch_size=None):
+    """Sends a batch of due messages.
+
+    Rows are locked while they're sent (`SKIP LOCKED`), so several workers
+    may run at once. Sent messages are deleted, failed ones are retried
+    with a backoff up to EMAIL_QUEUE_MAX_ATTEMPTS times.
+
+    Args:
+        delivery - SMTPDelivery.
+        batch_size - Messages per batch, `EMAIL_QUEUE_BATCH_SIZE` by default.
+    Returns:
+        Tuple of (sent, failed) numbers of messages.
+    Raises:
+        RelayUnavailable - The relay can't be reached, messages not sent
+            yet are left for later.
+    """
+    batch_size = batch_size or settings.EMAIL_QUEUE_BATCH_SIZE
+    sent = []
+    failed = []
+    unavailable = None
+
+    with transaction.atomic():
+        emails = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=QueuedEmail.QUEUED, next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at')[:batch_size]
+        )
+
+        for email in emails:
+            try:
+                refused = delivery.send(email)
+            except RelayUnavailable as error:
+                unavailable = error
+                break
+            except (OSError, smtplib.SMTPException) as error:
+                email.attempts += 1
+                email.last_error = str(error)
+                max_attempts = settings.EMAIL_QUEUE_MAX_ATTEMPTS
+                if is_permanent(error) or email.attempts >= max_attempts:
+                    email.status = QueuedEmail.FAILED
+                    logger.error('Email %s failed: %s', email.pk, error)
+                else:
+                    email.next_attempt_at = timezone.now() + timedelta(
+                        seconds=get_retry_delay(email.attempts)
+                    )
+                    logger.warning(
+                        'Email %s attempt %d failed: %s', email.pk, email.attempts, error
+                    )
+                failed.append(email)
+                continue
+
+            if refused:
+                logger.warning('Email %s refused for %s', email.pk, ', '.join(refused))
+            sent.append(email.pk)
+
+        QueuedEmail.objects.filter(pk__in=sent).delete()
+        QueuedEmail.objects.bulk_update(
+            failed, ['status', 'attempts', 'next_attempt_at', 'last_error']
+        )
+
+    if unavailable is not None:
+        raise unavailable
+    return len(sent), len(failed)
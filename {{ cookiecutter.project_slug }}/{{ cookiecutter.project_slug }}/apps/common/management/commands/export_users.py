@@ -0,0 +1,44 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...user_transfer import FORMATS, export_users, get_peak_memory
+
+
+class Command(BaseCommand):
+    help = (
+        'Exports all users with password hashes to a CSV or NDJSON file, which '
+        'import_users reads, streaming them from the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to write, - for stdout.')
+        parser.add_argument(
+            '--format', dest='output_format', choices=FORMATS,
+            help='Format of the file, by default from its extension (csv for stdout).',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000, help='Users fetched at once.'
+        )
+
+    def handle(self, *args, path, output_format, chunk_size, **options):
+        if output_format is None:
+            output_format = 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+        started_at = time.monotonic()
+        file = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        lines = 0
+        try:
+            for line in export_users(output_format, chunk_size):
+                file.write(line)
+                lines += 1
+        finally:
+            if file is not sys.stdout:
+                file.close()
+
+        users = lines - 1 if output_format == 'csv' else lines
+        self.stderr.write(
+            f'Exported {users} users in {time.monotonic() - started_at:.1f} s, '
+            f'peak memory {get_peak_memory():.0f} MB'
+        )
@@ -0,0 +1,97 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from ...models import User
+from ...user_transfer import (
+    CONFLICT_ACTIONS,
+    FIELDS,
+    FORMATS,
+    PASSWORD_FORMATS,
+    get_peak_memory,
+    import_users,
+    read_rows,
+)
+
+# Seconds between progress lines.
+PROGRESS_INTERVAL = 5
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports users from a CSV or NDJSON file in chunks, with COPY on PostgreSQL '
+        f'and bulk_create elsewhere. Fields: {", ".join(FIELDS)}.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, - for stdin.')
+        parser.add_argument(
+            '--format', dest='input_format', choices=FORMATS,
+            help='Format of the file, by default from its extension (csv for stdin).',
+        )
+        parser.add_argument(
+            '--on-conflict', choices=CONFLICT_ACTIONS, default='skip',
+            help='What to do with existing usernames. Default: skip.',
+        )
+        parser.add_argument(
+            '--passwords', dest='password_format', choices=PASSWORD_FORMATS,
+            default='hashed',
+            help=(
+                'Password hashes (e.g. from export_users) or plain text passwords, '
+                'hashed per row, which is slow. Default: hashed.'
+            ),
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows per chunk.')
+        parser.add_argument(
+            '--method', choices=('copy', 'bulk_create'),
+            help='Loading method, by default copy on PostgreSQL.',
+        )
+
+    def handle(
+        self, *args, path, input_format, on_conflict, password_format, chunk_size,
+        method, **options
+    ):
+        if input_format is None:
+            input_format = 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+        started_at = time.monotonic()
+        reported_at = started_at
+        users_before = User.objects.count()
+
+        def progress(read):
+            nonlocal reported_at
+            now = time.monotonic()
+            if now - reported_at >= PROGRESS_INTERVAL:
+                reported_at = now
+                self.stderr.write(
+                    f'{read} rows, {read / (now - started_at):.0f} rows/s, '
+                    f'peak memory {get_peak_memory():.0f} MB'
+                )
+
+        file = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            read = import_users(
+                read_rows(file, input_format),
+                on_conflict=on_conflict,
+                password_format=password_format,
+                chunk_size=chunk_size,
+                method=method,
+                progress=progress,
+            )
+        except (ValueError, IntegrityError) as error:
+            raise CommandError(
+                f'{error}\nUsers created before the error: '
+                f'{User.objects.count() - users_before}'
+            )
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(
+            f'Read {read} rows in {elapsed:.1f} s ({read / max(elapsed, 0.001):.0f} rows/s), '
+            f'{User.objects.count() - users_before} users created, '
+            f'peak memory {get_peak_memory():.0f} MB'
+        )
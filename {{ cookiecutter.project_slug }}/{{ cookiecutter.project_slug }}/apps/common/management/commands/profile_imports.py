@@ -0,0 +1,137 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Line of `python -X importtime`: self and cumulative time in microseconds,
+# and the module name indented by its nesting level.
+IMPORT_TIME_PATTERN = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| +(\S+)$')
+
+# Code run in a fresh interpreter, loading what a process of the target loads.
+TARGETS = {
+    'wsgi': 'import {{ cookiecutter.project_slug }}.wsgi',
+    'asgi': 'import {{ cookiecutter.project_slug }}.asgi',
+    'setup': 'import django; django.setup()',
+}
+
+SCRIPT = '''
+import json, time
+started_at = time.perf_counter()
+{code}
+from django.apps import apps
+print(json.dumps(dict(
+    elapsed=time.perf_counter() - started_at,
+    apps=[config.name for config in apps.get_app_configs()],
+)))
+'''
+
+
+def parse_import_times(output):
+    """Returns imports reported by `python -X importtime`.
+
+    Returns:
+        List of (module, self time, cumulative time), times in microseconds.
+    """
+    imports = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if match:
+            self_time, cumulative, module = match.groups()
+            imports.append((module, int(self_time), int(cumulative)))
+    return imports
+
+
+def group_by_app(imports, app_names):
+    """Sums self times of modules by the app (or top level package) they're in.
+
+    Returns:
+        Dictionary of {app or package: (time in microseconds, modules)}.
+    """
+    # Longest names first, so `django.contrib.admin` wins over `django`.
+    app_names = sorted(app_names, key=len, reverse=True)
+    groups = defaultdict(lambda: [0, 0])
+
+    for module, self_time, _cumulative in imports:
+        group = next(
+            (name for name in app_names if module == name or module.startswith(name + '.')),
+            module.partition('.')[0],
+        )
+        groups[group][0] += self_time
+        groups[group][1] += 1
+
+    return {group: tuple(values) for group, values in groups.items()}
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports an entry point in a fresh interpreter with `python -X importtime` '
+        'and reports the time spent per app, per package and in the slowest modules.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', choices=TARGETS, default='wsgi',
+            help=(
+                'What to load: a web worker (wsgi, asgi) or all apps of a management '
+                'command, including COMMAND_APPS (setup). Default: wsgi.'
+            ),
+        )
+        parser.add_argument(
+            '--limit', type=int, default=20, help='Number of modules and packages shown.'
+        )
+
+    def handle(self, *args, target, limit, **options):
+        env = os.environ.copy()
+        env['DJANGO_SETTINGS_MODULE'] = settings.SETTINGS_MODULE
+        if target == 'setup':
+            env['DJANGO_COMMAND_APPS'] = '1'
+        else:
+            # Web workers are started without it, see `COMMAND_APPS` in settings.
+            env.pop('DJANGO_COMMAND_APPS', None)
+
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', SCRIPT.format(code=TARGETS[target])],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(f'Loading {target} failed:\n{result.stderr[-2000:]}')
+
+        loaded = json.loads(result.stdout.strip().splitlines()[-1])
+        imports = parse_import_times(result.stderr)
+        groups = group_by_app(imports, loaded['apps'])
+        apps = set(loaded['apps'])
+        total = sum(self_time for _module, self_time, _cumulative in imports)
+
+        self.stdout.write(
+            f'{target}: loaded in {loaded["elapsed"] * 1000:.0f} ms, '
+            f'{len(imports)} modules imported in {total / 1000:.0f} ms, '
+            f'{len(apps)} apps installed'
+        )
+
+        self.write_table(
+            'Installed apps (self time of their modules)',
+            ((name, *groups.get(name, (0, 0))) for name in apps),
+        )
+        self.write_table(
+            'Other packages',
+            ((name, *values) for name, values in groups.items() if name not in apps),
+            limit,
+        )
+
+        self.stdout.write('\nSlowest modules (cumulative, including their imports)')
+        slowest = sorted(imports, key=lambda item: item[2], reverse=True)[:limit]
+        for module, _self_time, cumulative in slowest:
+            self.stdout.write(f'  {cumulative / 1000:8.1f} ms  {module}')
+
+    def write_table(self, title, rows, limit=None):
+        rows = sorted(rows, key=lambda row: row[1], reverse=True)[:limit]
+        self.stdout.write(f'\n{title}')
+        for name, self_time, modules in rows:
+            self.stdout.write(f'  {self_time / 1000:8.1f} ms  {modules:4d} modules  {name}')
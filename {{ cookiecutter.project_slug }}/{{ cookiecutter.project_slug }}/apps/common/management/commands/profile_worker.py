@@ -0,0 +1,56 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...profiler import FORMATS, MAX_DURATION, get_output_dir, request_profile
+
+
+class Command(BaseCommand):
+    help = (
+        'Captures stack samples of running gunicorn workers and writes them to '
+        'PROFILER_OUTPUT_DIR, in collapsed (flamegraph.pl) or speedscope format.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('pids', nargs='+', type=int, help='PIDs of workers to profile.')
+        parser.add_argument(
+            '--duration', type=float, help='Seconds to sample for (PROFILER_DURATION).'
+        )
+        parser.add_argument(
+            '--format', dest='output_format', choices=FORMATS,
+            help='Output format (PROFILER_FORMAT).',
+        )
+        parser.add_argument(
+            '--no-wait', action='store_true', help="Don't wait for the profiles."
+        )
+
+    def handle(self, *args, pids, duration, output_format, no_wait, **options):
+        started_at = time.time()
+
+        for pid in pids:
+            try:
+                request_profile(pid, duration, output_format)
+            except ProcessLookupError:
+                raise CommandError(f'No process with PID {pid}.')
+            except PermissionError:
+                raise CommandError(f'Not allowed to signal PID {pid}.')
+            except ValueError as error:
+                raise CommandError(error)
+
+        if no_wait:
+            return
+
+        duration = min(duration or settings.PROFILER_DURATION, MAX_DURATION)
+        time.sleep(duration + 1)
+
+        for pid in pids:
+            profiles = [
+                path for path in get_output_dir().glob(f'{pid}-*')
+                if path.name.endswith(tuple(FORMATS.values()))
+                and path.stat().st_mtime >= started_at
+            ]
+            if profiles:
+                self.stdout.write(str(max(profiles, key=lambda path: path.stat().st_mtime)))
+            else:
+                self.stderr.write(f'No profile written by PID {pid}.')
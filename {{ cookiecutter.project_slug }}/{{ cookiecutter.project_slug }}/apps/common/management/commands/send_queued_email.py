@@ -0,0 +1,77 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from ...mail import RelayUnavailable, SMTPDelivery, deliver_batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Delivers messages stored by QueuedEmailBackend in batches over a reused '
+        'SMTP connection, waiting for new ones until stopped (SIGTERM) or --once.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true', help='Exit when no message is due, e.g. in cron.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, help='Messages per batch (EMAIL_QUEUE_BATCH_SIZE).'
+        )
+        parser.add_argument(
+            '--rate-limit', type=float,
+            help='Messages per second, 0 for no limit (EMAIL_QUEUE_RATE_LIMIT).',
+        )
+
+    def handle(self, *args, once, batch_size, rate_limit, **options):
+        batch_size = batch_size or settings.EMAIL_QUEUE_BATCH_SIZE
+        delivery = SMTPDelivery(rate_limit=rate_limit)
+        # Set by SIGTERM/SIGINT, the current batch is finished first.
+        stopping = threading.Event()
+        relay_delay = settings.EMAIL_QUEUE_POLL_INTERVAL
+
+        handlers = {
+            signum: signal.signal(signum, lambda signum, frame: stopping.set())
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+
+        try:
+            while not stopping.is_set():
+                try:
+                    sent, failed = deliver_batch(delivery, batch_size)
+                except RelayUnavailable as error:
+                    if once:
+                        raise CommandError(f'Mail relay unavailable: {error}')
+                    self.stderr.write(
+                        f'Mail relay unavailable, retrying in {relay_delay:.0f} s: {error}'
+                    )
+                    self.wait(stopping, relay_delay)
+                    relay_delay = min(relay_delay * 2, settings.EMAIL_QUEUE_MAX_RETRY_DELAY)
+                    continue
+
+                relay_delay = settings.EMAIL_QUEUE_POLL_INTERVAL
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent} messages, {failed} failed.')
+                if sent + failed < batch_size:
+                    # Nothing else is due, don't keep an idle connection open.
+                    delivery.close()
+                    if once:
+                        break
+                    self.wait(stopping, settings.EMAIL_QUEUE_POLL_INTERVAL)
+        finally:
+            delivery.close()
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def wait(self, stopping, seconds):
+        """Waits between batches of a long running worker.
+
+        Then drops database connections which broke or outlived CONN_MAX_AGE
+        in the meantime, as Django does between requests. Never called with
+        --once, which may run in a transaction (e.g. of a TestCase).
+        """
+        stopping.wait(seconds)
+        close_old_connections()
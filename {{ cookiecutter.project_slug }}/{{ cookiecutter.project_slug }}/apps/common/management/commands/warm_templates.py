@@ -0,0 +1,87 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+
+
+def get_template_names(engine):
+    """Returns names of all templates found by the loaders of an engine.
+
+    Names found in more than one directory are listed once, as only the
+    first one is ever loaded.
+    """
+    names = []
+    seen = set()
+
+    for loader in engine.template_loaders:
+        get_dirs = getattr(loader, 'get_dirs', None)
+        if get_dirs is None:
+            continue
+
+        for directory in get_dirs():
+            for root, dirnames, filenames in os.walk(directory):
+                dirnames[:] = sorted(name for name in dirnames if not name.startswith('.'))
+                for filename in sorted(filenames):
+                    if filename.startswith('.'):
+                        continue
+                    name = os.path.relpath(os.path.join(root, filename), directory)
+                    name = name.replace(os.sep, '/')
+                    if name not in seen:
+                        seen.add(name)
+                        names.append(name)
+
+    return names
+
+
+def warm_templates():
+    """Compiles every template of all Django template engines.
+
+    With the cached loader compiled templates stay in memory of the process,
+    so requests don't pay for parsing.
+
+    Returns:
+        Tuple of (number of compiled templates, [(name, error), ...]).
+    """
+    compiled = 0
+    errors = []
+
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+
+        engine = backend.engine
+        for name in get_template_names(engine):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError as e:
+                errors.append((name, e))
+            except UnicodeDecodeError:
+                # Not a template, e.g. an image next to templates.
+                continue
+            else:
+                compiled += 1
+
+    return compiled, errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Compiles all templates, filling the cached template loader of this '
+        'process. Fails if any template has a syntax error.'
+    )
+
+    def handle(self, *args, **options):
+        started_at = time.monotonic()
+        compiled, errors = warm_templates()
+
+        for name, error in errors:
+            self.stderr.write(f'{name}: {error}')
+        if errors:
+            raise CommandError(f'{len(errors)} templates have syntax errors.')
+
+        self.stdout.write(
+            f'Compiled {compiled} templates in '
+            f'{(time.monotonic() - started_at) * 1000:.0f} ms.'
+        )
@@ -0,0 +1,386 @@
+import logging
+import mimetypes
+import random
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import http_date, parse_etags
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from .assets import get_preload_links
+from .consent import Consent
+from .storage import ENCODINGS, HASHED_NAME_RE
+from .timing import RequestMetrics, current_metrics
+
+timing_logger = logging.getLogger('apps.timing')
+
+# Structure of `variants`: ((content_encoding or None, path, size, etag), ...),
+# in order of preference, with the uncompressed file last.
+StaticFile = namedtuple(
+    'StaticFile', ['content_type', 'last_modified', 'cache_control', 'variants']
+)
+
+TEXT_CONTENT_TYPES = {'application/javascript', 'application/json', 'image/svg+xml'}
+
+
+class SyncAsyncMiddleware:
+    """Base of middleware running natively under both WSGI and ASGI.
+
+    Django picks the mode from `get_response`. Under ASGI `__call__` returns
+    a coroutine, so there is no thread switch as with `MiddlewareMixin`; the
+    `process_request`/`process_response` hooks must not block for that reason.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        response = self.process_request(request)
+        if response is None:
+            response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        response = self.process_request(request)
+        if response is None:
+            response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_request(self, request):
+        return None
+
+    def process_response(self, request, response):
+        return response
+
+
+class ServerTimingMiddleware(SyncAsyncMiddleware):
+    """Measures where the time of sampled requests goes.
+
+    `SERVER_TIMING_SAMPLE_RATE` (0 to 1) of requests get RequestMetrics as
+    `request.metrics`: database queries and their time, hits and misses of
+    `TieredCache`, template rendering time and asset lookups. These are sent
+    in a `Server-Timing` header if `SERVER_TIMING_HEADER` is enabled and
+    logged to the `apps.timing` logger with the request, so
+    `DjangoRequestJsonFormatter` writes them as `timing`. Requests which
+    are not sampled cost a `random()` call and a context variable lookup
+    per query.
+
+    Place it first, so it measures the whole middleware stack.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 0)
+        self.header = getattr(settings, 'SERVER_TIMING_HEADER', False)
+
+        if iscoroutinefunction(self):
+            # Keeps Django from running the sync hook in a thread.
+            self.process_template_response = self.aprocess_template_response
+
+    def process_request(self, request):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+
+        metrics = request.metrics = RequestMetrics()
+        request._metrics_token = current_metrics.set(metrics)
+        return None
+
+    def process_response(self, request, response):
+        metrics = getattr(request, 'metrics', None)
+        if metrics is None:
+            return response
+
+        metrics.finish()
+        current_metrics.reset(request._metrics_token)
+
+        if self.header:
+            response['Server-Timing'] = metrics.server_timing()
+        timing_logger.info(
+            'Request timing',
+            extra={'request': request, 'status_code': response.status_code},
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        return self.measure_rendering(request, response)
+
+    async def aprocess_template_response(self, request, response):
+        # `process_template_response` is this method under ASGI.
+        return self.measure_rendering(request, response)
+
+    def measure_rendering(self, request, response):
+        """Adds the rendering time of a TemplateResponse to request metrics."""
+        metrics = getattr(request, 'metrics', None)
+        if metrics is None:
+            return response
+
+        started_at = time.perf_counter()
+
+        def finish_rendering(response):
+            metrics.template_time += time.perf_counter() - started_at
+
+        response.add_post_render_callback(finish_rendering)
+        return response
+
+
+class ConsentMiddleware(SyncAsyncMiddleware):
+    """Attaches GDPR consent state to the request as `request.consent`.
+
+    Cookies are parsed on first access only, once per request.
+    """
+
+    def process_request(self, request):
+        request.consent = SimpleLazyObject(lambda: Consent.from_request(request))
+
+
+class AssetPreloadMiddleware(SyncAsyncMiddleware):
+    """Announces assets used by a response in `Link: rel=preload` headers.
+
+    `render_css`/`render_js` record entry points on the request, so browsers
+    (and CDNs which turn `Link` headers into 103 Early Hints) can start
+    fetching the bundles without waiting for the tags in the HTML body.
+
+    With `ASSETS_EARLY_HINTS` enabled, links learned for a URL pattern are
+    also sent as a `103 Early Hints` response before the view runs. This
+    writes to the raw gunicorn socket, so it requires gunicorn and a proxy
+    which forwards 1xx responses (e.g. nginx 1.29+ with `early_hints`) and
+    is skipped under ASGI.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.early_hints = getattr(settings, 'ASSETS_EARLY_HINTS', False)
+        # Structure: {url_pattern: (link, ...)}
+        self.known_routes = {}
+
+        if iscoroutinefunction(self):
+            # Keeps Django from running the sync `process_view` in a thread.
+            self.early_hints = False
+            self.process_view = self.aprocess_view
+
+    def process_response(self, request, response):
+        links = get_preload_links(request)
+        if links:
+            if response.has_header('Link'):
+                response['Link'] = ', '.join((response['Link'],) + links)
+            else:
+                response['Link'] = ', '.join(links)
+
+            if self.early_hints and request.resolver_match:
+                self.known_routes[request.resolver_match.route] = links
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self.early_hints:
+            return None
+
+        links = self.known_routes.get(request.resolver_match.route)
+        if links:
+            send_early_hints(request, links)
+
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return None
+
+
+def send_early_hints(request, links):
+    """Writes a `103 Early Hints` response to the client socket.
+
+    Args:
+        request(HttpRequest) - Incoming request served by gunicorn.
+        links - `Link` header values to send.
+    """
+    sock = request.META.get('gunicorn.socket')
+    if sock is None or request.META.get('SERVER_PROTOCOL') != 'HTTP/1.1':
+        return
+
+    headers = ''.join(f'Link: {link}\r\n' for link in links)
+    try:
+        sock.sendall(f'HTTP/1.1 103 Early Hints\r\n{headers}\r\n'.encode('latin-1'))
+    except (OSError, UnicodeEncodeError):
+        pass
+
+
+class PrecompressedStaticMiddleware(SyncAsyncMiddleware):
+    """Serves files from STATIC_ROOT, preferring precompressed variants.
+
+    STATIC_ROOT is indexed once when the middleware is created, so requests
+    cost no filesystem lookups. The variant is negotiated from
+    `Accept-Encoding` (see `CompressedManifestStaticFilesStorage` for how
+    `.br`/`.zst`/`.gz` siblings are made) and sent with `FileResponse`,
+    which gunicorn passes to `sendfile`. Hashed files are cached forever.
+    Under ASGI files are read in a thread, as Django can't stream them there
+    without blocking.
+
+    Place it right after `SecurityMiddleware` so static requests skip the
+    rest of the stack.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.prefix = settings.STATIC_URL
+        self.files = index_static_files(settings.STATIC_ROOT)
+
+    def find(self, request):
+        """Returns indexed StaticFile for the request or None."""
+        if request.method in ('GET', 'HEAD') and request.path.startswith(self.prefix):
+            return self.files.get(request.path[len(self.prefix):])
+        return None
+
+    def process_request(self, request):
+        static_file = self.find(request)
+        if static_file is not None:
+            return serve_static_file(request, static_file)
+        return None
+
+    async def __acall__(self, request):
+        static_file = self.find(request)
+        if static_file is not None:
+            return await sync_to_async(serve_static_file, thread_sensitive=False)(
+                request, static_file, streaming=False
+            )
+        return await self.get_response(request)
+
+
+def index_static_files(root):
+    """Builds a map of static file names to their servable variants.
+
+    Args:
+        root - Directory with collected static files (STATIC_ROOT).
+    Returns:
+        Dictionary of {name relative to root: StaticFile}.
+    """
+    if not root or not Path(root).is_dir():
+        return {}
+
+    root = Path(root)
+    suffixes = {suffix for _, suffix, _ in ENCODINGS}
+    files = {}
+
+    for path in root.rglob('*'):
+        if not path.is_file():
+            continue
+        # Compressed siblings are served as variants of their original.
+        if path.suffix in suffixes and path.with_suffix('').is_file():
+            continue
+
+        stat = path.stat()
+        # Every variant is a different representation, so it gets its own ETag.
+        etag = f'{int(stat.st_mtime):x}-{stat.st_size:x}'
+        variants = [
+            (encoding, sibling, sibling.stat().st_size, f'"{etag}-{encoding}"')
+            for encoding, sibling in (
+                (encoding, path.with_name(path.name + suffix))
+                for encoding, suffix, _ in ENCODINGS
+            )
+            if sibling.is_file()
+        ]
+        variants.append((None, path, stat.st_size, f'"{etag}"'))
+
+        content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in TEXT_CONTENT_TYPES:
+            content_type += '; charset=utf-8'
+
+        if HASHED_NAME_RE.search(path.name):
+            cache_control = 'public, max-age=31536000, immutable'
+        else:
+            cache_control = 'public, max-age=60'
+
+        files[path.relative_to(root).as_posix()] = StaticFile(
+            content_type=content_type,
+            last_modified=http_date(stat.st_mtime),
+            cache_control=cache_control,
+            variants=tuple(variants),
+        )
+
+    return files
+
+
+def accepted_encodings(header):
+    """Returns the set of content codings accepted by an `Accept-Encoding` value."""
+    accepted = set()
+
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+
+    return accepted
+
+
+def etag_matches(etag, header):
+    """Returns True if an `If-None-Match` value matches an ETag.
+
+    Compared weakly (ignoring `W/`), as RFC 9110 requires for If-None-Match.
+    """
+    etags = parse_etags(header)
+    if etags == ['*']:
+        return True
+    return etag.removeprefix('W/') in {tag.removeprefix('W/') for tag in etags}
+
+
+def serve_static_file(request, static_file, streaming=True):
+    """Returns a response with the best variant of a static file.
+
+    Args:
+        request(HttpRequest) - Incoming GET or HEAD request.
+        static_file(StaticFile) - Indexed static file.
+        streaming - Send the file with FileResponse (sendfile under WSGI),
+            otherwise read it into the response.
+    """
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    encoding, path, size, etag = next(
+        variant for variant in static_file.variants
+        if variant[0] is None or variant[0] in accepted
+    )
+    headers = {
+        'ETag': etag,
+        'Last-Modified': static_file.last_modified,
+        'Cache-Control': static_file.cache_control,
+        'Vary': 'Accept-Encoding',
+    }
+
+    if etag_matches(etag, request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=static_file.content_type)
+    elif not streaming:
+        with open(path, 'rb') as f:
+            response = HttpResponse(f.read(), content_type=static_file.content_type)
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=static_file.content_type)
+        # FileResponse names the file inline, which is pointless for assets.
+        del response['Content-Disposition']
+
+    response['Content-Length'] = size
+    if encoding is not None:
+        response['Content-Encoding'] = encoding
+    for header, value in headers.items():
+        response[header] = value
+
+    return response
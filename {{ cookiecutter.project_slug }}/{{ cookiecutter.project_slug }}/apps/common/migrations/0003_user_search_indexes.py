@@ -0,0 +1,51 @@
+from django.db import migrations
+
+# Fields of `UserAdmin.search_fields`, searched with `UPPER(field::text) LIKE`.
+SEARCH_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+
+def get_index_name(field):
+    return f'common_user_{field}_trgm'
+
+
+def create_search_indexes(apps, schema_editor):
+    """Creates trigram indexes serving `icontains` searches of the admin.
+
+    PostgreSQL only, built without locking the table for writes.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    table = schema_editor.quote_name(apps.get_model('common', 'User')._meta.db_table)
+    # pg_trgm is a trusted extension, the database owner may create it.
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {get_index_name(field)} '
+            f'ON {table} USING gin (UPPER({schema_editor.quote_name(field)}::text) '
+            f'gin_trgm_ops)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f'DROP INDEX CONCURRENTLY IF EXISTS {get_index_name(field)}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY can't run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('common', '0002_queuedemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,95 @@
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+CONSTRAINTS = [
+    models.UniqueConstraint(
+        Lower('username'),
+        name='common_user_username_lower_uniq',
+        violation_error_message='A user with that username already exists.',
+    ),
+    models.UniqueConstraint(
+        Lower('email'),
+        condition=models.Q(('email', ''), _negated=True),
+        name='common_user_email_lower_uniq',
+        violation_error_message='A user with that email address already exists.',
+    ),
+]
+
+# Structure: {constraint name: (field, WHERE clause)}
+POSTGRESQL_INDEXES = {
+    'common_user_username_lower_uniq': ('username', ''),
+    'common_user_email_lower_uniq': ('email', " WHERE email <> ''"),
+}
+
+
+def check_duplicates(User):
+    """Raises ValueError listing values used by several users, ignoring case."""
+    for field in ('username', 'email'):
+        duplicates = list(
+            User.objects.exclude(**{field: ''})
+            .values(value=Lower(field))
+            .annotate(count=models.Count('pk'))
+            .filter(count__gt=1)
+            .values_list('value', flat=True)[:10]
+        )
+        if duplicates:
+            raise ValueError(
+                f'Users share {field}s differing only in case: '
+                f'{", ".join(duplicates)}. Change them before migrating.'
+            )
+
+
+def add_constraints(apps, schema_editor):
+    """Creates the unique indexes of CONSTRAINTS.
+
+    On PostgreSQL they're built without locking the table for writes, as
+    the same indexes `UniqueConstraint` would create.
+    """
+    User = apps.get_model('common', 'User')
+    check_duplicates(User)
+
+    if schema_editor.connection.vendor != 'postgresql':
+        for constraint in CONSTRAINTS:
+            schema_editor.add_constraint(User, constraint)
+        return
+
+    table = schema_editor.quote_name(User._meta.db_table)
+    for name, (field, condition) in POSTGRESQL_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+            f'ON {table} (LOWER({schema_editor.quote_name(field)})){condition}'
+        )
+
+
+def remove_constraints(apps, schema_editor):
+    User = apps.get_model('common', 'User')
+
+    if schema_editor.connection.vendor != 'postgresql':
+        for constraint in CONSTRAINTS:
+            schema_editor.remove_constraint(User, constraint)
+        return
+
+    for name in POSTGRESQL_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY can't run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('common', '0003_user_search_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(add_constraints, remove_constraints),
+            ],
+            state_operations=[
+                migrations.AddConstraint(model_name='user', constraint=constraint)
+                for constraint in CONSTRAINTS
+            ],
+        ),
+    ]
@@ -1,6 +1,63 @@
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 from django.contrib.auth.models import AbstractUser
 
 class User(AbstractUser):
-    pass
+    class Meta(AbstractUser.Meta):
+        # Usernames and email addresses are unique ignoring case, and the
+        # indexes serve lookups of `EmailOrUsernameBackend`. Created by
+        # migration 0004 without locking the table on PostgreSQL.
+        constraints = [
+            models.UniqueConstraint(
+                Lower('username'),
+                name='common_user_username_lower_uniq',
+                violation_error_message='A user with that username already exists.',
+            ),
+            models.UniqueConstraint(
+                Lower('email'),
+                condition=~models.Q(email=''),
+                name='common_user_email_lower_uniq',
+                violation_error_message='A user with that email address already exists.',
+            ),
+        ]
+
+
+class QueuedEmail(models.Model):
+    """Message stored by `QueuedEmailBackend` until `send_queued_email` sends it.
+
+    `message` holds the message as sent over SMTP and the addresses are
+    sanitized, so the worker sends rows as they are. Sent messages are
+    deleted, failed ones are kept with the last error.
+    """
+
+    QUEUED = 'queued'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (FAILED, 'Failed'),
+    )
+
+    subject = models.TextField(blank=True)
+    from_email = models.TextField()
+    recipients = models.JSONField()
+    message = models.BinaryField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Only queued messages are polled, failed ones don't grow the index.
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(status='queued'),
+                name='queued_email_due_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.subject
@@ -0,0 +1,247 @@
+import hashlib
+import time
+from collections import namedtuple
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.utils.translation import get_language
+
+from .assets import record_entry_point
+from .timing import measure
+from .utils import get_consent
+
+# Structure of `entry_points`: ((entry_point, file_type), ...) recorded while
+# rendering, replayed on hits so `AssetPreloadMiddleware` sends `Link` headers.
+CachedPage = namedtuple(
+    'CachedPage',
+    ['content', 'headers', 'etag', 'last_modified', 'fresh_until', 'entry_points'],
+)
+
+CACHE_CONTROL_SKIP = ('private', 'no-cache', 'no-store')
+
+# How often a request waiting for another worker to render a page checks the cache.
+LOCK_POLL_INTERVAL = 0.05
+
+# Stored instead of a page whose response can't be cached, so requests run the
+# view right away instead of waiting for the lock held by an earlier request.
+UNCACHEABLE = 'uncacheable'
+
+
+class PageCache:
+    """Caches whole responses of GET/HEAD views.
+
+    Keys vary on the host and full path, the active language, the consent
+    state (`request.consent`) and the auth state. Requests of logged in
+    users are passed to the view, unless `authenticated` is set, which
+    caches pages per user.
+
+    Cached pages get a content based ETag and Last-Modified, so conditional
+    requests are answered with `304 Not Modified` before the view runs.
+
+    A page stays fresh for `timeout` seconds and is kept `stale_timeout`
+    seconds longer. A stale page is rebuilt by a single request holding a
+    lock, while the others get the stale page. A missing page is rendered
+    by the lock holder, the others wait for it up to `lock_wait` seconds.
+
+    Only 200 responses without cookies, without private Cache-Control and
+    without a CSRF token rendered in them are cached. When a response can't
+    be cached, requests run the view without locking for `timeout` seconds.
+
+    Args:
+        timeout - Seconds a page is fresh.
+        stale_timeout - Seconds a stale page may be served while it's rebuilt,
+            defaults to `timeout`.
+        authenticated - Cache pages of logged in users, per user.
+        alias - Cache alias.
+        key_prefix - Prefix of cache keys, e.g. to invalidate pages of a view.
+        lock_timeout - Seconds a lock is held at most (the longest render time).
+        lock_wait - Seconds to wait for a page rendered by another request.
+    """
+
+    def __init__(
+        self,
+        timeout=60,
+        stale_timeout=None,
+        authenticated=False,
+        alias='default',
+        key_prefix='page',
+        lock_timeout=10,
+        lock_wait=5,
+    ):
+        self.timeout = timeout
+        self.stale_timeout = timeout if stale_timeout is None else stale_timeout
+        self.authenticated = authenticated
+        self.alias = alias
+        self.key_prefix = key_prefix
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get_user_key(self, request):
+        """Returns the auth state part of a key, or None if not cacheable."""
+        # Without a session cookie the user is anonymous, checked without
+        # touching the session (which would add `Vary: Cookie`).
+        if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            return 'anonymous'
+
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return 'anonymous'
+        if not self.authenticated:
+            return None
+        return f'user:{user.pk}'
+
+    def get_key(self, request):
+        """Returns the cache key of a request, or None if it's not cacheable."""
+        if request.method not in ('GET', 'HEAD'):
+            return None
+
+        user_key = self.get_user_key(request)
+        if user_key is None:
+            return None
+
+        parts = (
+            request.get_host(),
+            request.get_full_path(),
+            get_language() or '',
+            get_consent(request).pack(),
+            user_key,
+        )
+        digest = hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+        return f'{self.key_prefix}:{digest}'
+
+    def is_cacheable(self, request, response):
+        if response.status_code != 200 or response.streaming or response.cookies:
+            return False
+        # The page contains a CSRF token bound to the cookie of this client.
+        if request.META.get('CSRF_COOKIE_USED'):
+            return False
+        cache_control = response.get('Cache-Control', '')
+        return not any(value in cache_control for value in CACHE_CONTROL_SKIP)
+
+    def build(self, request, view, args, kwargs, key):
+        """Runs the view and caches its response, or UNCACHEABLE if not possible.
+
+        Returns:
+            Tuple of (response, CachedPage or None).
+        """
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            with measure('template_time'):
+                response = response.render()
+
+        if not self.is_cacheable(request, response):
+            self.cache.set(key, UNCACHEABLE, self.timeout)
+            return response, None
+
+        now = time.time()
+        digest = hashlib.md5(response.content, usedforsecurity=False).hexdigest()
+        page = CachedPage(
+            content=response.content,
+            headers=tuple(response.items()),
+            etag=f'"{digest}"',
+            last_modified=int(now),
+            fresh_until=now + self.timeout,
+            entry_points=tuple(getattr(request, 'asset_entry_points', ())),
+        )
+        self.cache.set(key, page, self.timeout + self.stale_timeout)
+        return response, page
+
+    def wait(self, key):
+        """Returns what another request stored, page or UNCACHEABLE, or None."""
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            page = self.cache.get(key)
+            if page is not None:
+                return page
+        return None
+
+    def serve(self, request, view, args, kwargs):
+        key = self.get_key(request)
+        if key is None:
+            return view(request, *args, **kwargs)
+
+        cache = self.cache
+        lock_key = f'{key}:lock'
+        page = cache.get(key)
+        if page == UNCACHEABLE:
+            return view(request, *args, **kwargs)
+
+        if page is None or page.fresh_until <= time.time():
+            # The lock expires on its own; a delete would be broadcast to all
+            # processes by `TieredCache`.
+            if cache.add(lock_key, 1, self.lock_timeout):
+                response, new_page = self.build(request, view, args, kwargs, key)
+                if new_page is None:
+                    return response
+                page = new_page
+            elif page is None:
+                page = self.wait(key)
+                if page == UNCACHEABLE:
+                    return view(request, *args, **kwargs)
+                if page is None:
+                    response, page = self.build(request, view, args, kwargs, key)
+                    if page is None:
+                        return response
+
+        return self.respond(request, page)
+
+    def respond(self, request, page):
+        """Returns a response built from a cached page, or `304 Not Modified`."""
+        for entry_point, file_type in page.entry_points:
+            record_entry_point(request, entry_point, file_type)
+
+        response = get_conditional_response(
+            request, etag=page.etag, last_modified=page.last_modified
+        )
+        if response is None:
+            response = HttpResponse(page.content)
+            for header, value in page.headers:
+                response[header] = value
+
+        response['ETag'] = page.etag
+        response['Last-Modified'] = http_date(page.last_modified)
+        patch_vary_headers(response, ('Cookie', 'Accept-Language'))
+        return response
+
+
+def cache_page_for(timeout=60, **options):
+    """Decorator caching responses of a view with `PageCache`.
+
+    Args:
+        timeout - Seconds a page is fresh.
+        options - Other arguments of `PageCache`.
+    """
+    page_cache = PageCache(timeout, **options)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return page_cache.serve(request, view, args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class PageCacheMixin:
+    """View mixin caching responses with `PageCache`.
+
+    Configured with `page_cache_timeout` and `page_cache_options`.
+    """
+
+    page_cache_timeout = 60
+    page_cache_options = {}
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        return cache_page_for(cls.page_cache_timeout, **cls.page_cache_options)(view)
@@ -0,0 +1,134 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from django.contrib.auth.models import Group, Permission
+
+from asgiref.sync import sync_to_async
+
+from .models import User
+
+# Version of all permission sets, bumped when groups or permissions change.
+VERSION_KEY = 'permissions:version'
+# Version of the permission set of one user, bumped when their groups or
+# permissions change.
+USER_VERSION_KEY = 'permissions:version:{pk}'
+# Structure: (version, user version, is_superuser, {'app_label.codename', ...})
+PERMISSIONS_KEY = 'permissions:user:{pk}'
+
+M2M_ACTIONS = ('post_add', 'post_remove', 'post_clear')
+
+
+def get_permissions(user, load):
+    """Returns the permission set of a user from the cache or `load(user)`.
+
+    The versions and the set are fetched in one `get_many`. A set is used
+    only if it was stored under the current versions, so sets of earlier
+    versions are never served, even when stored late by a slow request.
+    Missing versions start from the current time, above any evicted one.
+    """
+    version_key = USER_VERSION_KEY.format(pk=user.pk)
+    permissions_key = PERMISSIONS_KEY.format(pk=user.pk)
+    found = cache.get_many([VERSION_KEY, version_key, permissions_key])
+
+    for key in (VERSION_KEY, version_key):
+        if key not in found:
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+
+    versions = (found[VERSION_KEY], found[version_key], user.is_superuser)
+    entry = found.get(permissions_key)
+    if entry is not None and entry[:3] == versions:
+        return entry[3]
+
+    permissions = load(user)
+    cache.set(
+        permissions_key, (*versions, permissions), settings.PERMISSION_CACHE_TIMEOUT
+    )
+    return permissions
+
+
+def invalidate_permissions(pk=None, using=None):
+    """Bumps the version of a user's permission set, or of all.
+
+    In a transaction it's bumped right away, so checks later in it (e.g. in
+    a TestCase) see the change, and again after the transaction commits, as
+    other requests may store sets without it in the meantime. `cache.incr`
+    is atomic, so concurrent bumps aren't lost.
+    """
+    key = VERSION_KEY if pk is None else USER_VERSION_KEY.format(pk=pk)
+
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Missing, it starts anew when read.
+            pass
+
+    if transaction.get_connection(using).in_atomic_block:
+        bump()
+    transaction.on_commit(bump, using=using)
+
+
+class CachedPermissionsMixin:
+    """Authentication backend mixin caching users' permissions across requests.
+
+    `ModelBackend` loads the permissions of a user with joins of groups and
+    permissions once per request, cached on the user instance. This keeps
+    them in the default cache for PERMISSION_CACHE_TIMEOUT seconds, until
+    groups or permissions change (see `get_permissions`). Changes made with
+    `QuerySet.update()`, `bulk_create()` of through models or raw SQL send no
+    signals; call `invalidate_permissions()` after them.
+
+    Only `get_all_permissions` is cached, which `has_perm`, `has_perms` and
+    `has_module_perms` use.
+    """
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, '_perm_cache'):
+            user_obj._perm_cache = get_permissions(
+                user_obj, super().get_all_permissions
+            )
+        return user_obj._perm_cache
+
+    async def aget_all_permissions(self, user_obj, obj=None):
+        return await sync_to_async(self.get_all_permissions)(user_obj, obj)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_user_permissions(
+    sender, instance, action, reverse, pk_set, using, **kwargs
+):
+    if action not in M2M_ACTIONS:
+        return
+    if not reverse:
+        invalidate_permissions(instance.pk, using)
+    elif pk_set is not None:
+        # Users added to or removed from a group or permission.
+        for pk in pk_set:
+            invalidate_permissions(pk, using)
+    else:
+        # All users cleared from a group or permission.
+        invalidate_permissions(using=using)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_permissions(sender, action, using, **kwargs):
+    if action in M2M_ACTIONS:
+        invalidate_permissions(using=using)
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(post_delete, sender=Group)
+@receiver(post_migrate)
+def invalidate_all_permissions(sender, using, **kwargs):
+    # Migrations create permissions with `bulk_create()`, which superusers have.
+    invalidate_permissions(using=using)
@@ -0,0 +1,310 @@
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+# Signal starting a capture in a worker, unused by gunicorn and uvicorn.
+PROFILER_SIGNAL = signal.SIGPROF
+
+FORMATS = {
+    'collapsed': '.folded',
+    'speedscope': '.speedscope.json',
+}
+
+MAX_DURATION = 300
+
+logger = logging.getLogger('apps.profiler')
+
+_active_lock = threading.Lock()
+# Write end of the pipe waking up `watch_requests`, set by `install_signal_handler`.
+_wakeup_fd = None
+
+
+def get_output_dir():
+    return Path(settings.PROFILER_OUTPUT_DIR)
+
+
+def get_request_path(pid):
+    """Returns the path of a file with capture options for a worker."""
+    return get_output_dir() / f'{pid}.request.json'
+
+
+def get_worker_path(pid):
+    """Returns the path of a file registering a worker handling PROFILER_SIGNAL."""
+    return get_output_dir() / f'{pid}.worker'
+
+
+def get_start_time(pid):
+    """Returns the start time of a process from /proc, or None without it."""
+    try:
+        stat = Path(f'/proc/{pid}/stat').read_text()
+    except OSError:
+        return None
+    # The command name in the second field may contain spaces.
+    return int(stat.rpartition(')')[2].split()[19])
+
+
+def register_worker():
+    """Registers this process as a worker which may be sent PROFILER_SIGNAL."""
+    path = get_worker_path(os.getpid())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(get_start_time(os.getpid())))
+
+
+def is_worker(pid):
+    """Returns whether a process registered itself with `register_worker`.
+
+    A registration left by an exited process doesn't match the start time of
+    another process which got its PID.
+    """
+    try:
+        start_time = json.loads(get_worker_path(pid).read_text())
+    except (OSError, ValueError):
+        return False
+    return start_time == get_start_time(pid)
+
+
+class SamplingProfiler(threading.Thread):
+    """Samples stacks of all other threads of the process from a thread.
+
+    Every `interval` seconds the current frame of each thread is read
+    with `sys._current_frames()`, so profiled code runs unmodified and
+    nothing is done outside of a capture. Stacks are aggregated by their
+    frames (function and file), rooted in the thread name.
+
+    Args:
+        duration - Seconds to sample for.
+        output_format - One of FORMATS.
+        interval - Seconds between samples.
+    """
+
+    def __init__(self, duration, output_format, interval):
+        super().__init__(name='sampling-profiler', daemon=True)
+        self.duration = duration
+        self.output_format = output_format
+        self.interval = interval
+        self.stacks = Counter()
+        # Structure: {code object: frame name}
+        self.frame_names = {}
+        self.path = get_output_dir() / '{}-{}{}'.format(
+            os.getpid(), datetime.now().strftime('%Y%m%d-%H%M%S'), FORMATS[output_format]
+        )
+
+    def frame_name(self, code):
+        name = self.frame_names.get(code)
+        if name is None:
+            name = self.frame_names[code] = (
+                f'{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})'
+            )
+        return name
+
+    def sample(self):
+        own_id = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(self.frame_name(frame.f_code))
+                frame = frame.f_back
+            stack.append(thread_names.get(thread_id, str(thread_id)))
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+
+    def run(self):
+        try:
+            deadline = time.monotonic() + self.duration
+            while time.monotonic() < deadline:
+                self.sample()
+                time.sleep(self.interval)
+            self.write()
+        finally:
+            _active_lock.release()
+
+    def write(self):
+        if self.output_format == 'speedscope':
+            content = json.dumps(self.to_speedscope())
+        else:
+            content = self.to_collapsed()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.path.with_name(self.path.name + '.tmp')
+        temporary_path.write_text(content)
+        temporary_path.replace(self.path)
+
+    def to_collapsed(self):
+        """Returns stacks in the collapsed format of flamegraph.pl."""
+        return ''.join(
+            '{} {}\n'.format(';'.join(stack), count)
+            for stack, count in self.stacks.most_common()
+        )
+
+    def to_speedscope(self):
+        """Returns stacks as a sampled speedscope profile.
+
+        See https://www.speedscope.app/file-format-schema.json
+        """
+        frames = []
+        # Structure: {frame name: index in frames}
+        indexes = {}
+        samples = []
+        weights = []
+
+        for stack, count in self.stacks.most_common():
+            sample = []
+            for name in stack:
+                if name not in indexes:
+                    indexes[name] = len(frames)
+                    frames.append({'name': name})
+                sample.append(indexes[name])
+            samples.append(sample)
+            weights.append(count * self.interval)
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': f'PID {os.getpid()}',
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights,
+            }],
+            'exporter': '{{ cookiecutter.project_slug }} profiler',
+        }
+
+
+def start_profiler(duration=None, output_format=None, interval=None):
+    """Starts a capture in this process.
+
+    Args:
+        duration - Seconds to sample for, `PROFILER_DURATION` by default.
+        output_format - One of FORMATS, `PROFILER_FORMAT` by default.
+        interval - Seconds between samples, `PROFILER_INTERVAL` by default.
+    Returns:
+        Path the profile will be written to, or None if a capture is running.
+    """
+    if not _active_lock.acquire(blocking=False):
+        return None
+
+    try:
+        profiler = SamplingProfiler(
+            min(float(duration or settings.PROFILER_DURATION), MAX_DURATION),
+            output_format or settings.PROFILER_FORMAT,
+            float(interval or settings.PROFILER_INTERVAL),
+        )
+        profiler.start()
+    except Exception:
+        _active_lock.release()
+        raise
+
+    return profiler.path
+
+
+def request_profile(pid, duration=None, output_format=None):
+    """Asks another worker to start a capture with the given options.
+
+    Args:
+        pid - PID of the worker.
+        duration - Seconds to sample for.
+        output_format - One of FORMATS.
+    Raises:
+        ValueError - If the process isn't a registered worker, which the
+            signal (terminating processes by default) would kill.
+    """
+    if not is_worker(pid):
+        raise ValueError(f'{pid} is not a worker.')
+
+    path = get_request_path(pid)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({'duration': duration, 'output_format': output_format}))
+    try:
+        os.kill(pid, PROFILER_SIGNAL)
+    except OSError:
+        path.unlink(missing_ok=True)
+        raise
+
+
+def handle_signal(signum, frame):
+    # Runs in the main thread between any two bytecodes, maybe while it holds
+    # locks of file objects or `threading`, so the capture is started by
+    # `watch_requests` instead.
+    try:
+        os.write(_wakeup_fd, b'\0')
+    except BlockingIOError:
+        # The pipe is full, `watch_requests` is woken up already.
+        pass
+
+
+def watch_requests(wakeup_fd):
+    """Starts captures requested with PROFILER_SIGNAL, run in a thread."""
+    while os.read(wakeup_fd, 512):
+        options = {}
+        path = get_request_path(os.getpid())
+        try:
+            options = json.loads(path.read_text())
+            path.unlink()
+        except (OSError, ValueError):
+            pass
+
+        try:
+            start_profiler(options.get('duration'), options.get('output_format'))
+        except Exception:
+            logger.exception('Starting a requested capture failed')
+
+
+def install_signal_handler():
+    """Makes `PROFILER_SIGNAL` start a capture in this process.
+
+    The process is registered as a worker, so `request_profile` signals it.
+    Called from the `post_worker_init` hook in `bin/gunicorn.conf.py`.
+    """
+    global _wakeup_fd
+
+    if _wakeup_fd is None:
+        wakeup_fd, _wakeup_fd = os.pipe()
+        os.set_blocking(_wakeup_fd, False)
+        threading.Thread(
+            target=watch_requests,
+            args=(wakeup_fd,),
+            name='profiler-requests',
+            daemon=True,
+        ).start()
+
+    signal.signal(PROFILER_SIGNAL, handle_signal)
+    register_worker()
+
+
+def get_sibling_pids():
+    """Returns PIDs of other processes with the same parent (gunicorn workers).
+
+    Read from /proc, so empty on systems without it.
+    """
+    parent = os.getppid()
+    own = os.getpid()
+    pids = []
+
+    for entry in Path('/proc').glob('[0-9]*'):
+        try:
+            # The command name in the second field may contain spaces.
+            fields = (entry / 'stat').read_text().rpartition(')')[2].split()
+        except OSError:
+            continue
+        pid = int(entry.name)
+        if pid != own and int(fields[1]) == parent:
+            pids.append(pid)
+
+    return sorted(pids)
@@ -0,0 +1,187 @@
+import gzip
+import hashlib
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Hashed names as produced by ManifestStaticFilesStorage (`app.1a2b3c4d5e6f.css`)
+# and rsbuild (`app.1a2b3c4d5e6f7a8b.js`, `app.1a2b3c4d5e6f7a8b.js.map`).
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{8,}(\.[A-Za-z0-9]+)+$")
+
+COMPRESSIBLE_EXTENSIONS = {
+    ".css", ".js", ".mjs", ".json", ".map", ".svg", ".txt", ".xml", ".html",
+    ".ico", ".ttf", ".otf", ".eot",
+}
+
+# Files smaller than this are not worth a separate compressed copy.
+MIN_SIZE = 256
+
+
+def compress_gzip(data):
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def compress_brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+def compress_zstd(data):
+    return zstandard.ZstdCompressor(level=19).compress(data)
+
+
+# Available encodings, in order of preference.
+# Structure: [(content_encoding, suffix, compress_function)]
+ENCODINGS = [
+    encoding
+    for encoding, available in (
+        (("br", ".br", compress_brotli), brotli is not None),
+        (("zstd", ".zst", compress_zstd), zstandard is not None),
+        (("gzip", ".gz", compress_gzip), True),
+    )
+    if available
+]
+
+
+def is_compressible(path):
+    """Returns True if a static file should get precompressed siblings."""
+    return (
+        path.suffix in COMPRESSIBLE_EXTENSIONS
+        and HASHED_NAME_RE.search(path.name) is not None
+    )
+
+
+def compress_file(path, cache_dir=None):
+    """Writes compressed siblings of a file for every available encoding.
+
+    Only hashed files are passed here and their names change with content, so
+    existing siblings are kept as they are. With `cache_dir` set, compressed
+    data is also stored there under the SHA-256 of the content and reused on
+    the next run, even if the output directory was wiped in between. So are
+    empty `.skip` markers of encodings which didn't make the file smaller,
+    so it isn't compressed again only to be thrown away. Files below
+    MIN_SIZE are skipped by their size, without reading them.
+
+    Args:
+        path - Path of the file to compress.
+        cache_dir - Optional directory with previously compressed data.
+    Returns:
+        List of written sibling paths.
+    """
+    path = Path(path)
+    if path.stat().st_size < MIN_SIZE:
+        return []
+
+    pending = [
+        (suffix, compress)
+        for _, suffix, compress in ENCODINGS
+        if not path.with_name(path.name + suffix).exists()
+    ]
+    if not pending:
+        return []
+
+    data = path.read_bytes()
+    key = hashlib.sha256(data).hexdigest()
+    written = []
+
+    for suffix, compress in pending:
+        target = path.with_name(path.name + suffix)
+        cached = Path(cache_dir, key[:2], key + suffix) if cache_dir else None
+
+        if cached is not None and cached.exists():
+            shutil.copyfile(cached, target)
+            written.append(target)
+            continue
+        if cached is not None and cached.with_name(cached.name + ".skip").exists():
+            continue
+
+        compressed = compress(data)
+        # Serving the original is better than a compressed file which is larger.
+        if len(compressed) >= len(data):
+            if cached is not None:
+                cached.parent.mkdir(parents=True, exist_ok=True)
+                cached.with_name(cached.name + ".skip").touch()
+            continue
+
+        target.write_bytes(compressed)
+        written.append(target)
+
+        if cached is not None:
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            cached.write_bytes(compressed)
+
+    return written
+
+
+def compress_directory(root, cache_dir=None, workers=None):
+    """Compresses all hashed files below `root` in parallel.
+
+    Args:
+        root - Directory to walk (usually STATIC_ROOT).
+        cache_dir - Optional directory with previously compressed data.
+        workers - Number of processes, defaults to the number of CPUs.
+    Yields:
+        Tuples of (original path, written sibling paths).
+    """
+    paths = [
+        path
+        for path in Path(root).rglob("*")
+        if path.is_file() and is_compressible(path)
+    ]
+    if not paths:
+        return
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        results = executor.map(
+            compress_file, paths, [cache_dir] * len(paths), chunksize=8
+        )
+        yield from zip(paths, results)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage which also precompresses hashed files.
+
+    After collectstatic hashes collected files, every hashed file in
+    STATIC_ROOT (including rsbuild bundles) gets `.br`, `.zst` and `.gz`
+    siblings, depending on which compressors are installed. These are served
+    by `PrecompressedStaticMiddleware`. Set `STATIC_COMPRESS_CACHE_DIR` to
+    reuse compressed data of unchanged files between deploys.
+
+    Files written to STATIC_ROOT directly, not collected from finders (the
+    rsbuild output), aren't in the manifest. `static` serves them under their
+    own names, which rsbuild hashes already.
+    """
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if self.exists(name):
+                return name
+            raise
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+
+        if dry_run:
+            return
+
+        cache_dir = getattr(settings, "STATIC_COMPRESS_CACHE_DIR", None)
+        for path, written in compress_directory(self.location, cache_dir):
+            if written:
+                name = path.relative_to(self.location).as_posix()
+                yield name, ", ".join(target.name for target in written), True
@@ -1,7 +1,6 @@
 from django import template
-from django.utils.safestring import mark_safe
 
-from ..utils import is_consent_accepted
+from ..utils import get_consent, get_gdpr_payload
 
 register = template.Library()
 
@@ -9,12 +8,17 @@ register = template.Library()
 @register.simple_tag
 def gdpr_settings():
     """Render GDPR_SETTINGS to template inside script tag."""
-    return mark_safe(
-        '<script type="text/javascript">GDPR_SETTINGS = {{ "{{ GDPR_SETTINGS }}" }}</script>')
+    return get_gdpr_payload().script
+
+
+@register.simple_tag
+def gdpr_settings_hash():
+    """Render CSP hash source of the `gdpr_settings` script block."""
+    return get_gdpr_payload().csp_hash
 
 
 @register.simple_tag(takes_context=True)
 def is_consent_accepted(context, name):
     request = context['request']
 
-    return is_consent_accepted(request, name)
+    return get_consent(request).is_accepted(name)
@@ -1,3 +1,1305 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import logging
+import os
+import queue
+import re
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from email import message_from_bytes
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.template import engines
+from django.template.response import TemplateResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import path, reverse
+from django.utils import timezone
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import Group, Permission
+
+from fakeredis import FakeConnection
+
+from . import assets, log_handlers, profiler, storage, utils
+from .admin import UserAdmin
+from .cache import MAX_INVALIDATED, TieredCache
+from .consent import Consent
+from .context_processors import gdpr
+from .formatters import DjangoRequestJsonFormatter
+from .mail import RelayUnavailable, SMTPDelivery, deliver_batch
+from .middleware import (
+    AssetPreloadMiddleware,
+    ConsentMiddleware,
+    PrecompressedStaticMiddleware,
+    ServerTimingMiddleware,
+)
+from .models import QueuedEmail, User
+from .page_cache import UNCACHEABLE, PageCache
+from .permissions import PERMISSIONS_KEY
+from .templatetags.gdpr import gdpr_settings, gdpr_settings_hash
+from .timing import current_metrics
+from .user_transfer import export_users, import_users, read_rows
+
+ADDRESS_PATTERN = re.compile(r'<(.*)>')
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Speaks enough SMTP for `smtplib`, replies to RCPT set by the server."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 localhost')
+        sender, recipients = None, []
+
+        for line in self.rfile:
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ('EHLO', 'HELO', 'RSET', 'NOOP'):
+                self.reply('250 localhost')
+            elif verb == 'MAIL':
+                sender, recipients = ADDRESS_PATTERN.search(command).group(1), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                address = ADDRESS_PATTERN.search(command).group(1)
+                code = server.recipient_replies.get(address, 250)
+                if code == 250:
+                    recipients.append(address)
+                self.reply(f'{code} {address}')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = b''.join(iter(self.rfile.readline, b'.\r\n'))
+                server.messages.append((sender, recipients, message_from_bytes(data)))
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Not implemented')
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Local SMTP server recording received messages."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.connections = 0
+        self.messages = []
+        # Structure: {recipient: reply code to RCPT}
+        self.recipient_replies = {}
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+MIDDLEWARE_PATH = '{{ cookiecutter.project_slug }}.apps.common.middleware.{}'
+
+
+def timed_view(request):
+    User.objects.count()
+    cache.get('missing')
+    return TemplateResponse(request, engines['django'].from_string('page'))
+
+
+def assets_view(request):
+    assets.record_entry_point(request, 'app', 'css')
+    return HttpResponse('view')
+
+
+# URLconf of requests made with test clients (`ROOT_URLCONF=__name__`).
+urlpatterns = [
+    path('timed/', timed_view),
+    path('assets/', assets_view),
+]
+
+
+@override_settings(
+    EMAIL_BACKEND='{{ cookiecutter.project_slug }}.apps.common.mail.QueuedEmailBackend',
+    EMAIL_HOST='127.0.0.1',
+    EMAIL_HOST_USER='',
+    EMAIL_HOST_PASSWORD='',
+    EMAIL_USE_TLS=False,
+    EMAIL_USE_SSL=False,
+    EMAIL_QUEUE_RATE_LIMIT=0,
+)
+class QueuedEmailTests(TestCase):
+    def setUp(self):
+        self.server = SMTPStandIn()
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(EMAIL_PORT=self.server.server_address[1])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def queue(self, count, to='user@example.com'):
+        for number in range(count):
+            mail.send_mail(f'Message {number}', 'Body', 'from@example.com', [to])
+
+    def test_messages_are_stored_without_connecting(self):
+        self.queue(2)
+
+        self.assertEqual(QueuedEmail.objects.count(), 2)
+        self.assertEqual(self.server.connections, 0)
+
+    def test_batch_is_sent_over_one_connection(self):
+        self.queue(3)
+
+        self.assertEqual(deliver_batch(SMTPDelivery()), (3, 0))
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(
+            [message['Subject'] for _sender, _recipients, message in self.server.messages],
+            ['Message 0', 'Message 1', 'Message 2'],
+        )
+        self.assertEqual(
+            self.server.messages[0][:2], ('from@example.com', ['user@example.com'])
+        )
+        self.assertFalse(QueuedEmail.objects.exists())
+
+    def test_connection_is_replaced_after_messages_per_connection(self):
+        self.queue(3)
+
+        deliver_batch(SMTPDelivery(messages_per_connection=2))
+
+        self.assertEqual(len(self.server.messages), 3)
+        self.assertEqual(self.server.connections, 2)
+
+    def test_temporary_failure_is_retried_later(self):
+        self.server.recipient_replies['busy@example.com'] = 450
+        self.queue(1, to='busy@example.com')
+
+        self.assertEqual(deliver_batch(SMTPDelivery()), (0, 1))
+        email = QueuedEmail.objects.get()
+        self.assertEqual(email.status, QueuedEmail.QUEUED)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(deliver_batch(SMTPDelivery()), (0, 0))
+
+    @override_settings(EMAIL_QUEUE_MAX_ATTEMPTS=1)
+    def test_last_attempt_fails_the_message(self):
+        self.server.recipient_replies['busy@example.com'] = 450
+        self.queue(1, to='busy@example.com')
+
+        deliver_batch(SMTPDelivery())
+
+        self.assertEqual(QueuedEmail.objects.get().status, QueuedEmail.FAILED)
+
+    def test_permanent_failure_is_not_retried(self):
+        self.server.recipient_replies['unknown@example.com'] = 550
+        self.queue(1, to='unknown@example.com')
+        self.queue(1)
+
+        self.assertEqual(deliver_batch(SMTPDelivery()), (1, 1))
+        email = QueuedEmail.objects.get()
+        self.assertEqual(email.status, QueuedEmail.FAILED)
+        self.assertIn('unknown@example.com', email.last_error)
+
+    def test_unavailable_relay_leaves_messages_queued(self):
+        self.queue(2)
+
+        with override_settings(EMAIL_PORT=get_free_port()):
+            with self.assertRaises(RelayUnavailable):
+                deliver_batch(SMTPDelivery())
+
+        self.assertEqual(
+            list(QueuedEmail.objects.values_list('status', 'attempts')),
+            [(QueuedEmail.QUEUED, 0)] * 2,
+        )
+
+    def test_command_sends_due_messages(self):
+        self.queue(3)
+
+        stdout = io.StringIO()
+        call_command('send_queued_email', once=True, batch_size=2, stdout=stdout)
+
+        # Batches share the connection.
+        self.assertEqual(len(self.server.messages), 3)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(stdout.getvalue().count('Sent'), 2)
+        self.assertFalse(QueuedEmail.objects.exists())
+
+
+class UserTransferTests(TestCase):
+    def import_lines(self, lines, input_format='csv', **options):
+        rows = read_rows(io.StringIO(''.join(lines)), input_format)
+        return import_users(rows, chunk_size=2, **options)
+
+    def test_export_is_imported_with_the_same_passwords(self):
+        alice = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        bob = User.objects.create_user('bob', is_staff=True)
+        for output_format in ('csv', 'ndjson'):
+            with self.subTest(output_format):
+                lines = list(export_users(output_format))
+                User.objects.all().delete()
+
+                self.import_lines(lines, output_format)
+
+                self.assertEqual(
+                    list(User.objects.order_by('username').values_list(
+                        'username', 'email', 'is_staff', 'date_joined'
+                    )),
+                    [
+                        ('alice', 'alice@example.com', False, alice.date_joined),
+                        ('bob', '', True, bob.date_joined),
+                    ],
+                )
+                alice = User.objects.get(username='alice')
+                self.assertTrue(alice.check_password('secret'))
+                self.assertFalse(User.objects.get(username='bob').has_usable_password())
+
+    def test_existing_users_are_skipped_or_updated(self):
+        User.objects.create_user('alice', 'old@example.com')
+        lines = ['username,email\n', 'alice,new@example.com\n', 'bob,bob@example.com\n']
+
+        self.assertEqual(self.import_lines(lines), 2)
+        self.assertEqual(User.objects.get(username='alice').email, 'old@example.com')
+
+        self.import_lines(lines, on_conflict='update')
+        self.assertEqual(User.objects.get(username='alice').email, 'new@example.com')
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_raw_passwords_are_hashed(self):
+        lines = ['{"username": "alice", "password": "secret"}\n']
+
+        self.import_lines(lines, 'ndjson', password_format='raw')
+
+        self.assertTrue(User.objects.get().check_password('secret'))
+
+    def test_invalid_row_stops_the_import_after_saved_chunks(self):
+        lines = ['username,is_staff\n', 'a,1\n', 'b,0\n', 'c,maybe\n']
+
+        with self.assertRaisesRegex(ValueError, '^Line 4: is_staff'):
+            self.import_lines(lines)
+        self.assertEqual(User.objects.count(), 2)
+
+
+@override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=3)
+class UserAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', '', 'secret'))
+        for username in ('e', 'b', 'd', 'c', 'f'):
+            User.objects.create_user(username)
+        list_per_page = mock.patch.object(UserAdmin, 'list_per_page', 2)
+        list_per_page.start()
+        self.addCleanup(list_per_page.stop)
+
+    def get_all_pages(self, query_string=''):
+        """Returns usernames of all pages, following keyset links."""
+        url = reverse('admin:common_user_changelist')
+        query_string = query_string or '?'
+        usernames = []
+        while query_string:
+            response = self.client.get(url + query_string)
+            self.assertEqual(response.status_code, 200)
+            changelist = response.context['cl']
+            self.assertTrue(changelist.keyset)
+            usernames += [user.username for user in changelist.result_list]
+            query_string = changelist.keyset_next_url
+        return usernames
+
+    def test_pages_are_linked_by_keyset(self):
+        self.assertEqual(self.get_all_pages(), ['admin', 'b', 'c', 'd', 'e', 'f'])
+
+    def test_keyset_follows_ordering(self):
+        # By username descending, by is_staff descending with ties by username.
+        self.assertEqual(self.get_all_pages('?o=-1'), ['f', 'e', 'd', 'c', 'b', 'admin'])
+        self.assertEqual(self.get_all_pages('?o=-5'), ['admin', 'b', 'c', 'd', 'e', 'f'])
+
+    def test_unknown_keyset_row_is_rejected(self):
+        url = reverse('admin:common_user_changelist')
+
+        response = self.client.get(url + '?after=0')
+
+        self.assertRedirects(response, url + '?e=1', fetch_redirect_response=False)
+
+
+class UserAuthenticationTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('Alice', 'Alice@Example.com', 'secret')
+
+    def test_login_by_username_or_email_ignores_case(self):
+        for login in ('Alice', 'alice', 'alice@example.com', 'ALICE@EXAMPLE.COM'):
+            with self.subTest(login):
+                self.assertEqual(authenticate(username=login, password='secret'), self.alice)
+        self.assertIsNone(authenticate(username='alice', password='wrong'))
+        self.assertIsNone(authenticate(username='bob', password='secret'))
+
+    def test_empty_login_matches_no_user_without_email(self):
+        User.objects.create_user('bob', '', 'secret')
+
+        self.assertIsNone(authenticate(username='', password='secret'))
+
+    def test_username_wins_over_email_of_another_user(self):
+        bob = User.objects.create_user('alice@example.org', 'bob@example.com', 'secret')
+        User.objects.create_user('carol', 'Alice@example.org', 'secret')
+
+        self.assertEqual(authenticate(username='alice@example.org', password='secret'), bob)
+
+    def test_usernames_and_emails_are_unique_ignoring_case(self):
+        with self.assertRaisesMessage(ValidationError, 'username already exists'):
+            User(username='ALICE', email='other@example.com').validate_constraints()
+        with self.assertRaisesMessage(ValidationError, 'email address already exists'):
+            User(username='bob', email='alice@example.COM').validate_constraints()
+        # Users without an email don't conflict.
+        User.objects.create_user('bob')
+        User.objects.create_user('carol')
+
+    def test_recent_last_login_is_not_updated(self):
+        self.assertTrue(self.client.login(username='alice', password='secret'))
+        last_login = User.objects.get().last_login
+        self.assertIsNotNone(last_login)
+
+        self.assertTrue(self.client.login(username='alice', password='secret'))
+        self.assertEqual(User.objects.get().last_login, last_login)
+
+        User.objects.update(last_login=last_login - timedelta(hours=1))
+        self.assertTrue(self.client.login(username='alice', password='secret'))
+        self.assertGreater(User.objects.get().last_login, last_login)
+
+
+class PermissionCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice')
+        self.group = Group.objects.create(name='editors')
+        self.permission = Permission.objects.get(codename='change_user')
+
+    def has_perm(self, pk=None):
+        """Returns whether a freshly loaded user (as in a new request) can change users."""
+        return User.objects.get(pk=pk or self.user.pk).has_perm('common.change_user')
+
+    def test_permissions_are_loaded_once_across_requests(self):
+        self.has_perm()
+
+        with self.assertNumQueries(1):
+            self.assertFalse(self.has_perm())
+
+    def test_group_and_user_changes_invalidate_permissions(self):
+        other = User.objects.create_user('bob')
+        self.assertFalse(self.has_perm())
+        self.assertFalse(self.has_perm(other.pk))
+
+        self.user.groups.add(self.group)
+        self.assertFalse(self.has_perm())
+
+        self.group.permissions.add(self.permission)
+        self.assertTrue(self.has_perm())
+        self.assertFalse(self.has_perm(other.pk))
+
+        self.group.user_set.add(other)
+        self.assertTrue(self.has_perm(other.pk))
+
+        self.group.delete()
+        self.assertFalse(self.has_perm())
+
+        self.user.user_permissions.add(self.permission)
+        self.assertTrue(self.has_perm())
+
+    def test_sets_stored_before_commit_are_invalidated(self):
+        self.has_perm()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_permissions.add(self.permission)
+            # As if another request stored its set before the commit.
+            self.has_perm()
+            stored = cache.get(PERMISSIONS_KEY.format(pk=self.user.pk))
+
+        self.assertTrue(self.has_perm())
+        self.assertNotEqual(cache.get(PERMISSIONS_KEY.format(pk=self.user.pk)), stored)
+
+    def test_superuser_flag_is_part_of_the_cached_set(self):
+        self.assertFalse(self.has_perm())
+
+        User.objects.filter(pk=self.user.pk).update(is_superuser=True)
+
+        # `has_perm` of superusers doesn't ask backends.
+        permissions = User.objects.get(pk=self.user.pk).get_all_permissions()
+        self.assertIn('common.change_user', permissions)
+
+
+class CompressFileTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        self.cache_dir = self.root / 'cache'
+        self.compress = mock.Mock(side_effect=storage.compress_gzip)
+        encodings = mock.patch.object(
+            storage, 'ENCODINGS', [('gzip', '.gz', self.compress)]
+        )
+        encodings.start()
+        self.addCleanup(encodings.stop)
+
+    def write_file(self, content, directory='static'):
+        path = self.root / directory / 'app.0123456789ab.js'
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(content)
+        return path
+
+    def test_compressed_data_is_reused_from_cache(self):
+        content = b'console.log("hello");\n' * 100
+        path = self.write_file(content)
+
+        written = storage.compress_file(path, self.cache_dir)
+        self.assertEqual(written, [path.with_name(path.name + '.gz')])
+        # A deploy to a wiped output directory.
+        path = self.write_file(content, 'static2')
+        written = storage.compress_file(path, self.cache_dir)
+
+        self.assertEqual(self.compress.call_count, 1)
+        self.assertEqual(gzip.decompress(written[0].read_bytes()), content)
+
+    def test_encodings_not_making_files_smaller_are_remembered(self):
+        content = os.urandom(4096)
+        path = self.write_file(content)
+
+        self.assertEqual(storage.compress_file(path, self.cache_dir), [])
+        self.assertEqual(storage.compress_file(path, self.cache_dir), [])
+
+        self.assertEqual(self.compress.call_count, 1)
+        self.assertFalse(path.with_name(path.name + '.gz').exists())
+
+    def test_small_files_are_not_read(self):
+        path = self.write_file(b'x' * (storage.MIN_SIZE - 1))
+
+        with mock.patch.object(Path, 'read_bytes') as read_bytes:
+            self.assertEqual(storage.compress_file(path, self.cache_dir), [])
+        read_bytes.assert_not_called()
+
+    def test_source_maps_of_hashed_files_are_compressible(self):
+        self.assertTrue(storage.is_compressible(Path('app.0123456789ab.js.map')))
+        self.assertFalse(storage.is_compressible(Path('app.js.map')))
+
+
+class CompressedManifestStaticFilesStorageTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = storage.CompressedManifestStaticFilesStorage(
+            location=directory.name, base_url='/static/'
+        )
+
+    def test_files_written_to_static_root_are_served_under_their_names(self):
+        self.storage.save('app.0123456789ab.js', ContentFile(b'console.log(1);'))
+
+        self.assertEqual(
+            self.storage.url('app.0123456789ab.js'), '/static/app.0123456789ab.js'
+        )
+
+    def test_missing_files_raise(self):
+        with self.assertRaises(ValueError):
+            self.storage.url('missing.js')
+
+
+class PrecompressedStaticMiddlewareTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        root = self.root = Path(directory.name)
+        self.content = b'body { color: red; }\n' * 100
+        (root / 'app.0123456789ab.css').write_bytes(self.content)
+        (root / 'app.0123456789ab.css.gz').write_bytes(gzip.compress(self.content))
+        (root / 'robots.txt').write_bytes(b'User-agent: *\n')
+
+        with override_settings(STATIC_ROOT=str(root), STATIC_URL='/static/'):
+            self.middleware = PrecompressedStaticMiddleware(
+                lambda request: HttpResponse('view')
+            )
+        self.factory = RequestFactory()
+
+    def get(self, path, **headers):
+        response = self.middleware(self.factory.get(path, headers=headers))
+        content = b''.join(response) if response.streaming else response.content
+        response.close()
+        return response, content
+
+    def test_best_accepted_variant_is_served(self):
+        response, content = self.get(
+            '/static/app.0123456789ab.css', accept_encoding='br;q=0, gzip'
+        )
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(
+            response['Cache-Control'], 'public, max-age=31536000, immutable'
+        )
+        self.assertEqual(response['Content-Type'], 'text/css; charset=utf-8')
+        self.assertEqual(gzip.decompress(content), self.content)
+
+    def test_uncompressed_file_is_served_without_accepted_encodings(self):
+        response, content = self.get(
+            '/static/app.0123456789ab.css', accept_encoding='gzip;q=0'
+        )
+
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(content, self.content)
+        self.assertEqual(int(response['Content-Length']), len(self.content))
+
+    def test_unhashed_files_are_cached_briefly(self):
+        response, _ = self.get('/static/robots.txt')
+
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+
+    def test_matching_etag_is_not_modified(self):
+        response, _ = self.get('/static/robots.txt')
+
+        response, content = self.get(
+            '/static/robots.txt', if_none_match=response['ETag']
+        )
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(content, b'')
+
+    def test_encoded_variants_have_own_etags(self):
+        gzipped, _ = self.get('/static/app.0123456789ab.css', accept_encoding='gzip')
+        identity, _ = self.get('/static/app.0123456789ab.css')
+
+        self.assertNotEqual(gzipped['ETag'], identity['ETag'])
+        response, _ = self.get(
+            '/static/app.0123456789ab.css', if_none_match=gzipped['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_none_match_is_parsed(self):
+        etag = self.get('/static/robots.txt')[0]['ETag']
+        cases = [
+            ('*', 304),
+            (f'"other", W/{etag}', 304),
+            (etag[:-2] + '"', 200),
+            (f'"x{etag[1:]}', 200),
+        ]
+        for if_none_match, status_code in cases:
+            with self.subTest(if_none_match):
+                response, _ = self.get(
+                    '/static/robots.txt', if_none_match=if_none_match
+                )
+                self.assertEqual(response.status_code, status_code)
+
+    def test_other_requests_reach_the_view(self):
+        for path in ('/static/missing.css', '/hello/'):
+            with self.subTest(path):
+                self.assertEqual(self.get(path)[1], b'view')
+
+    async def test_files_are_served_under_asgi(self):
+        with self.settings(
+            STATIC_ROOT=str(self.root),
+            STATIC_URL='/static/',
+            MIDDLEWARE=[MIDDLEWARE_PATH.format('PrecompressedStaticMiddleware')],
+            ROOT_URLCONF=__name__,
+        ):
+            response = await self.async_client.get(
+                '/static/app.0123456789ab.css', headers={'accept-encoding': 'gzip'}
+            )
+            view_response = await self.async_client.get('/assets/')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.content)
+        self.assertEqual(view_response.content, b'view')
+
+
+@override_settings(GDPR_SETTINGS={'title': '</script><b>&'})
+class GdprSettingsTests(SimpleTestCase):
+    def test_payload_is_escaped_for_script_blocks(self):
+        payload = utils.get_gdpr_payload()
+
+        self.assertEqual(
+            payload.json, '{"title": "\\u003C/script\\u003E\\u003Cb\\u003E\\u0026"}'
+        )
+        self.assertEqual(
+            payload.script,
+            f'<script type="text/javascript">GDPR_SETTINGS = {payload.json}</script>',
+        )
+        self.assertRegex(payload.csp_hash, r"^'sha256-[A-Za-z0-9+/]{43}='$")
+
+    def test_payload_is_computed_once_until_settings_change(self):
+        payload = utils.get_gdpr_payload()
+        self.assertIs(utils.get_gdpr_payload(), payload)
+
+        with override_settings(GDPR_SETTINGS={'title': 'changed'}):
+            self.assertEqual(utils.get_gdpr_payload().json, '{"title": "changed"}')
+        self.assertEqual(utils.get_gdpr_payload().json, payload.json)
+
+    def test_context_processor_and_tags_render_the_payload(self):
+        payload = utils.get_gdpr_payload()
+
+        context = gdpr(RequestFactory().get('/'))
+
+        self.assertEqual(str(context['GDPR_SETTINGS']), payload.json)
+        self.assertEqual(gdpr_settings(), payload.script)
+        self.assertEqual(gdpr_settings_hash(), payload.csp_hash)
+
+
+class ConsentTests(SimpleTestCase):
+    def get_consent(self, cookies):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies)
+        ConsentMiddleware(lambda request: HttpResponse())(request)
+        return request.consent
+
+    def test_category_cookies_are_parsed(self):
+        consent = self.get_consent(
+            {'gdpr-analytics': 'accepted', 'gdpr-example': 'false', 'custom': 'accepted'}
+        )
+
+        self.assertTrue(consent.has('gdpr-analytics'))
+        self.assertTrue(consent.is_accepted('gdpr-analytics'))
+        self.assertTrue(consent.has('gdpr-example'))
+        self.assertFalse(consent.is_accepted('gdpr-example'))
+        self.assertFalse(consent.has('gdpr-personalization'))
+        # Names outside GDPR_CONSENT_CATEGORIES are plain cookie lookups.
+        self.assertTrue(consent.is_accepted('custom'))
+        self.assertFalse(consent.has('other'))
+
+    @override_settings(GDPR_CONSENT_COOKIE=None)
+    def test_saved_category_cookies(self):
+        consent = Consent()
+        consent.set('gdpr-analytics')
+        consent.set('gdpr-example', accepted=False)
+        response = HttpResponse()
+
+        consent.save(response)
+
+        self.assertEqual(response.cookies['gdpr-analytics'].value, 'accepted')
+        self.assertEqual(response.cookies['gdpr-example'].value, 'false')
+        self.assertNotIn('gdpr', response.cookies)
+        self.assertNotIn('gdpr-consent', response.cookies)
+
+    def test_packed_cookie_replaces_category_cookies(self):
+        consent = self.get_consent({'gdpr-analytics': 'accepted'})
+        consent.set('gdpr-example')
+        response = HttpResponse()
+
+        consent.save(response)
+        cookies = {'gdpr-consent': response.cookies['gdpr-consent'].value}
+
+        # The category cookie of the request is replaced by the packed one.
+        self.assertEqual(response.cookies['gdpr-analytics'].value, '')
+        consent = self.get_consent(cookies)
+        self.assertTrue(consent.is_accepted('gdpr-analytics'))
+        self.assertTrue(consent.is_accepted('gdpr-example'))
+        self.assertFalse(consent.has('gdpr'))
+
+        for malformed in ('forged', '-1.-1'):
+            self.assertEqual(self.get_consent({'gdpr-consent': malformed}).given, 0)
+
+    def test_category_cookies_override_their_bits_of_packed_cookie(self):
+        consent = Consent()
+        consent.set('gdpr-analytics')
+        consent.set('gdpr-example')
+
+        # Declined later with `setDeclinedConsent` of the Vue module.
+        consent = self.get_consent({
+            'gdpr-consent': consent.pack(),
+            'gdpr-analytics': 'false',
+        })
+
+        self.assertTrue(consent.has('gdpr-analytics'))
+        self.assertFalse(consent.is_accepted('gdpr-analytics'))
+        self.assertTrue(consent.is_accepted('gdpr-example'))
+
+
+class DjangoRequestJsonFormatterTests(SimpleTestCase):
+    def setUp(self):
+        self.formatter = DjangoRequestJsonFormatter(
+            '%(levelname)s %(message)s', max_body_size=10, max_header_size=8
+        )
+        self.factory = RequestFactory()
+
+    def format(self, request=None):
+        record = logging.LogRecord(
+            'django.request', logging.ERROR, __file__, 1, 'Failed %s', ('GET',), None
+        )
+        if request is not None:
+            record.request = request
+        return json.loads(self.formatter.format(record))
+
+    def test_records_without_request_are_formatted(self):
+        data = self.format()
+
+        self.assertEqual(data['message'], 'Failed GET')
+        self.assertNotIn('request', data)
+
+    def test_headers_are_filtered_and_cut(self):
+        request = self.factory.get(
+            '/path/?a=1',
+            headers={
+                'Cookie': 'sessionid=x',
+                'Authorization': 'Bearer x',
+                'X-Long': 'x' * 20,
+            },
+        )
+
+        data = self.format(request)['request']
+
+        self.assertEqual(data['method'], 'GET')
+        self.assertEqual(data['path'], '/path/?a=1')
+        self.assertEqual(data['headers'], {'X-Long': 'x' * 8 + '...'})
+
+    def test_header_allowlist(self):
+        self.formatter = DjangoRequestJsonFormatter(header_allowlist=['X-Request-Id'])
+        request = self.factory.get('/', headers={'X-Request-Id': '1', 'X-Other': '2'})
+
+        data = self.format(request)['request']
+
+        self.assertEqual(data['headers'], {'X-Request-Id': '1'})
+
+    def test_json_body_is_cut(self):
+        request = self.factory.post(
+            '/', '{"a": "12345"}', content_type='application/json'
+        )
+        request.body
+
+        self.assertEqual(self.format(request)['request']['body'], '{"a": "123...')
+
+    def test_unread_bodies_are_read_within_limit_only(self):
+        content_type = 'application/x-www-form-urlencoded'
+        small = self.factory.post('/', 'a=1', content_type=content_type)
+        large = self.factory.post('/', 'a=' + 'x' * 20, content_type=content_type)
+
+        self.assertEqual(self.format(small)['request']['body'], 'a=1')
+        self.assertIsNone(self.format(large)['request']['body'])
+        self.assertFalse(hasattr(large, '_body'))
+
+    def test_other_bodies_are_not_logged(self):
+        request = self.factory.post('/', {'file': io.BytesIO(b'data')})
+
+        self.assertNotIn('body', self.format(request)['request'])
+        self.assertFalse(hasattr(request, '_body'))
+
+
+class BoundedQueueHandlerTests(SimpleTestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+        output = logging.StreamHandler(self.stream)
+        output.setFormatter(DjangoRequestJsonFormatter('%(message)s'))
+        self.handler = log_handlers.BoundedQueueHandler(queue.Queue(maxsize=2))
+        self.handler.listener = log_handlers.FlushingQueueListener(
+            self.handler.queue, output
+        )
+        self.addCleanup(self.handler.close)
+
+    def make_record(self, request):
+        record = logging.LogRecord(
+            'django.request', logging.ERROR, __file__, 1, 'Failed', None, None
+        )
+        record.request = request
+        return record
+
+    def test_request_is_serialized_in_the_logging_thread(self):
+        request = RequestFactory().post(
+            '/path/', '{"a": 1}', content_type='application/json'
+        )
+        record = self.make_record(request)
+
+        prepared = self.handler.prepare(record)
+
+        self.assertIs(record.request, request)
+        self.assertEqual(prepared.request['path'], '/path/')
+        self.assertEqual(prepared.request['body'], '{"a": 1}')
+
+        self.handler.handle(record)
+        self.handler.close()
+        data = json.loads(self.stream.getvalue())
+        self.assertEqual(data['request']['method'], 'POST')
+        self.assertEqual(data['request']['body'], '{"a": 1}')
+
+    def test_other_request_objects_are_dropped(self):
+        # `django.server` logs its socket as `request`.
+        with socket.socket() as sock:
+            prepared = self.handler.prepare(self.make_record(sock))
+
+        self.assertFalse(hasattr(prepared, 'request'))
+
+    def test_fork_hook_is_registered_once(self):
+        with mock.patch('os.register_at_fork') as register_at_fork:
+            log_handlers.BoundedQueueHandler(queue.Queue())
+        register_at_fork.assert_not_called()
+
+        inherited = self.handler.queue
+        log_handlers._after_fork()
+
+        self.assertIsNot(self.handler.queue, inherited)
+        self.assertIs(self.handler.listener.queue, self.handler.queue)
+
+
+class AssetRegistryTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.manifest = Path(directory.name, assets.MANIFEST_FILENAME)
+        self.write_manifest({
+            'app': {
+                'js': ['/static/app.1.js', '/static/a&b.js'],
+                'css': ['/static/app.1.css'],
+            },
+        })
+        settings = override_settings(STATIC_ROOT=directory.name, STATICFILES_DIRS=[])
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.registry = assets.AssetRegistry()
+
+    def write_manifest(self, manifest):
+        self.manifest.write_text(json.dumps(manifest))
+        # Move mtime forward, a rewrite may keep it on coarse filesystem clocks.
+        stat = self.manifest.stat()
+        os.utime(self.manifest, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_tags_are_rendered_from_the_manifest(self):
+        self.assertEqual(
+            self.registry.get('app', 'js'),
+            '<script defer src="/static/app.1.js"></script>\n'
+            '<script defer src="/static/a&amp;b.js"></script>',
+        )
+        self.assertEqual(
+            self.registry.get('app', 'css'),
+            '<link rel="stylesheet" href="/static/app.1.css">',
+        )
+        self.assertEqual(
+            self.registry.get_preload_links('app', 'css'),
+            ('</static/app.1.css>; rel=preload; as=style',),
+        )
+        self.assertEqual(self.registry.get('missing', 'js'), '')
+
+    def test_malformed_manifest_gives_an_empty_registry(self):
+        self.manifest.write_text('{')
+
+        self.assertEqual(self.registry.get('app', 'js'), '')
+
+    def test_manifest_is_read_once_unless_debug(self):
+        self.registry.get('app', 'js')
+        self.write_manifest({'app': {'js': ['/static/app.2.js']}})
+
+        self.assertIn('app.1.js', self.registry.get('app', 'js'))
+
+        with (
+            override_settings(DEBUG=True),
+            mock.patch.object(assets, 'DEBUG_CHECK_INTERVAL', 0),
+        ):
+            self.assertIn('app.2.js', self.registry.get('app', 'js'))
+
+    def test_rendered_entry_points_are_recorded_on_the_request(self):
+        request = RequestFactory().get('/')
+
+        assets.record_entry_point(request, 'app', 'css')
+        assets.record_entry_point(request, 'app', 'css')
+
+        self.assertEqual(request.asset_entry_points, {('app', 'css'): None})
+        with mock.patch.object(assets, 'registry', self.registry):
+            self.assertEqual(
+                assets.get_preload_links(request),
+                ('</static/app.1.css>; rel=preload; as=style',),
+            )
+
+
+class AssetPreloadMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.link = '</static/app.1.css>; rel=preload; as=style'
+        registry = assets.AssetRegistry()
+        registry.loaded = True
+        registry.preload_links = {'app': {'css': (self.link,)}}
+        patch = mock.patch.object(assets, 'registry', registry)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def view(self, request):
+        if request.GET.get('render'):
+            assets.record_entry_point(request, 'app', 'css')
+        return HttpResponse(headers={'Link': '</a>; rel=preconnect'})
+
+    def get(self, middleware, data=None, **meta):
+        request = RequestFactory().get('/', data, **meta)
+        request.resolver_match = mock.Mock(route='hello/')
+        middleware.process_view(request, self.view, (), {})
+        return middleware(request)
+
+    def test_links_of_rendered_assets_are_added(self):
+        middleware = AssetPreloadMiddleware(self.view)
+
+        response = self.get(middleware, {'render': '1'})
+
+        self.assertEqual(response['Link'], f'</a>; rel=preconnect, {self.link}')
+        self.assertEqual(self.get(middleware)['Link'], '</a>; rel=preconnect')
+
+    @override_settings(ASSETS_EARLY_HINTS=True)
+    def test_early_hints_are_sent_for_known_routes(self):
+        middleware = AssetPreloadMiddleware(self.view)
+        sock = mock.Mock()
+
+        self.get(middleware, {'render': '1'}, **{'gunicorn.socket': sock})
+        sock.sendall.assert_not_called()
+        self.get(middleware, **{'gunicorn.socket': sock})
+
+        sock.sendall.assert_called_once_with(
+            f'HTTP/1.1 103 Early Hints\r\nLink: {self.link}\r\n\r\n'.encode()
+        )
+
+    @override_settings(
+        ASSETS_EARLY_HINTS=True,
+        MIDDLEWARE=[MIDDLEWARE_PATH.format('AssetPreloadMiddleware')],
+        ROOT_URLCONF=__name__,
+    )
+    async def test_links_are_added_under_asgi(self):
+        # The sync hook (sending early hints) is replaced by `aprocess_view`.
+        with mock.patch.object(
+            AssetPreloadMiddleware, 'process_view', side_effect=AssertionError
+        ):
+            for _ in range(2):
+                response = await self.async_client.get('/assets/')
+
+        self.assertEqual(response['Link'], self.link)
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATE=1, SERVER_TIMING_HEADER=True)
+class ServerTimingMiddlewareTests(TestCase):
+    def view(self, request):
+        User.objects.count()
+        cache.get('missing')
+        template = engines['django'].from_string('page')
+        return TemplateResponse(request, template)
+
+    def get(self):
+        """Runs the middleware hooks in the order of Django's request handler."""
+        middleware = ServerTimingMiddleware(self.view)
+        request = RequestFactory().get('/')
+        middleware.process_request(request)
+        response = middleware.process_template_response(request, self.view(request))
+        response.render()
+        return request, middleware.process_response(request, response)
+
+    def test_sampled_requests_are_measured(self):
+        with self.assertLogs('apps.timing') as logs:
+            request, response = self.get()
+
+        metrics = request.metrics
+        self.assertEqual(metrics.db_queries, 1)
+        self.assertEqual(metrics.cache_misses, 1)
+        self.assertGreater(metrics.template_time, 0)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+        self.assertIs(logs.records[0].request, request)
+        # Nothing is left measuring later requests.
+        self.assertIsNone(current_metrics.get())
+
+    @override_settings(
+        MIDDLEWARE=[MIDDLEWARE_PATH.format('ServerTimingMiddleware')],
+        ROOT_URLCONF=__name__,
+    )
+    async def test_requests_are_measured_under_asgi(self):
+        with self.assertLogs('apps.timing') as logs:
+            response = await self.async_client.get('/timed/')
+
+        metrics = logs.records[0].request.metrics
+        self.assertEqual(metrics.db_queries, 1)
+        self.assertEqual(metrics.cache_misses, 1)
+        self.assertGreater(metrics.template_time, 0)
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_other_requests_are_not_measured(self):
+        request, response = self.get()
+
+        self.assertFalse(hasattr(request, 'metrics'))
+        self.assertNotIn('Server-Timing', response)
+
+
+class TieredCacheTests(SimpleTestCase):
+    def make_cache(self, location, **options):
+        """Returns a TieredCache with its own local tier, as in another process."""
+        shared = {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://tiered-cache-tests:6379/0',
+            'KEY_PREFIX': self.id(),
+            'OPTIONS': {'connection_class': FakeConnection},
+        }
+        return TieredCache(
+            f'{self.id()}-{location}', {'OPTIONS': {'SHARED': shared, **options}}
+        )
+
+    def test_values_are_served_from_the_local_tier(self):
+        tiered = self.make_cache('a')
+        # The first read syncs the local tier, which drops what it holds.
+        tiered.get('key')
+        tiered.set('key', 'value')
+        tiered.shared.delete(tiered.make_key('key'))
+
+        self.assertEqual(tiered.get('key'), 'value')
+        self.assertEqual(self.make_cache('b').get('key'), None)
+
+    def test_deletes_drop_keys_from_local_tiers_of_other_processes(self):
+        first = self.make_cache('a', SYNC_INTERVAL=0)
+        second = self.make_cache('b', SYNC_INTERVAL=0)
+        first.set_many({'deleted': 1, 'kept': 2})
+        self.assertEqual(len(second.get_many(['deleted', 'kept'])), 2)
+        first.shared.delete(first.make_key('kept'))
+
+        first.delete('deleted')
+
+        self.assertEqual(second.get_many(['deleted', 'kept']), {'kept': 2})
+
+    def test_lagging_processes_drop_whole_local_tiers(self):
+        first = self.make_cache('a', SYNC_INTERVAL=0)
+        second = self.make_cache('b', SYNC_INTERVAL=0)
+        first.set('kept', 1)
+        self.assertEqual(second.get('kept'), 1)
+        first.shared.delete(first.make_key('kept'))
+
+        first.delete_many(str(number) for number in range(MAX_INVALIDATED + 1))
+
+        self.assertEqual(second.get('kept'), None)
+
+    def test_clear_drops_local_tiers_of_other_processes(self):
+        first = self.make_cache('a', SYNC_INTERVAL=0)
+        second = self.make_cache('b', SYNC_INTERVAL=0)
+        first.set('key', 'value')
+        self.assertEqual(second.get('key'), 'value')
+
+        first.clear()
+
+        self.assertEqual(second.get('key'), None)
+
+    def test_incr_is_atomic(self):
+        tiered = [self.make_cache(location, SYNC_INTERVAL=0) for location in 'ab']
+        tiered[0].set('counter', 0, timeout=60)
+
+        def increment(cache):
+            for _ in range(50):
+                cache.incr('counter')
+
+        threads = [
+            threading.Thread(target=increment, args=(cache,)) for cache in tiered * 2
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([cache.get('counter') for cache in tiered], [200, 200])
+        with self.assertRaises(ValueError):
+            tiered[0].incr('missing')
+
+    def test_shared_cache_is_not_registered(self):
+        # Panels wrapping registered caches would see the pickled payloads.
+        shared = caches['default'].shared
+
+        self.assertNotIn(shared, caches.all())
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+)
+class PageCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.page_cache = PageCache(60, lock_wait=1)
+        self.calls = 0
+
+    def tearDown(self):
+        cache.clear()
+
+    def view(self, request):
+        self.calls += 1
+        response = HttpResponse(f'page {self.calls}')
+        if request.GET.get('cookie'):
+            response.set_cookie('name', 'value')
+        return response
+
+    def get(self, data=None, **meta):
+        request = RequestFactory().get('/page/', data, **meta)
+        return self.page_cache.serve(request, self.view, (), {})
+
+    def get_key(self, data=None):
+        return self.page_cache.get_key(RequestFactory().get('/page/', data))
+
+    def test_pages_are_cached(self):
+        response = self.get()
+
+        self.assertEqual(self.get().content, b'page 1')
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_page_is_served_while_another_request_rebuilds_it(self):
+        self.get()
+        key = self.get_key()
+        cache.set(key, cache.get(key)._replace(fresh_until=0))
+        cache.add(f'{key}:lock', 1)
+
+        self.assertEqual(self.get().content, b'page 1')
+
+        cache.delete(f'{key}:lock')
+        self.assertEqual(self.get().content, b'page 2')
+        self.assertEqual(self.get().content, b'page 2')
+
+    def test_missing_page_is_awaited_from_the_lock_holder(self):
+        self.get()
+        key = self.get_key()
+        page = cache.get(key)
+        cache.delete(key)
+        cache.add(f'{key}:lock', 1)
+        timer = threading.Timer(0.1, cache.set, (key, page))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        self.assertEqual(self.get().content, b'page 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_uncacheable_responses_are_not_awaited(self):
+        with mock.patch.object(PageCache, 'wait') as wait:
+            for _ in range(3):
+                self.assertTrue(self.get({'cookie': '1'}).cookies)
+
+        wait.assert_not_called()
+        self.assertEqual(self.calls, 3)
+        self.assertEqual(cache.get(self.get_key({'cookie': '1'})), UNCACHEABLE)
+
+    def test_pages_with_csrf_tokens_are_not_cached(self):
+        # A client with a CSRF cookie gets a token bound to it.
+        self.get(CSRF_COOKIE='secret', CSRF_COOKIE_USED=True)
+
+        self.assertEqual(self.get().content, b'page 2')
+
+
+class ProfilerTests(SimpleTestCase):
+    def setUp(self):
+        output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+        overridden = override_settings(
+            PROFILER_OUTPUT_DIR=output_dir.name, PROFILER_DURATION=0.05
+        )
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        self.output_dir = Path(output_dir.name)
+
+    def test_unregistered_processes_are_not_signalled(self):
+        profiler.get_worker_path(os.getpid()).parent.mkdir(exist_ok=True)
+        # Left by an exited worker which had the same PID.
+        profiler.get_worker_path(os.getpid()).write_text('1')
+
+        with mock.patch('os.kill') as kill:
+            for pid in (os.getpid(), os.getppid()):
+                with self.assertRaises(ValueError):
+                    profiler.request_profile(pid)
+
+        kill.assert_not_called()
+
+    def test_signal_starts_a_capture(self):
+        handler = signal.getsignal(profiler.PROFILER_SIGNAL)
+        self.addCleanup(signal.signal, profiler.PROFILER_SIGNAL, handler)
+        profiler.install_signal_handler()
+
+        profiler.request_profile(os.getpid(), output_format='collapsed')
+
+        for _ in range(100):
+            profiles = list(self.output_dir.glob('*.folded'))
+            if profiles:
+                break
+            time.sleep(0.05)
+        self.assertEqual(len(profiles), 1)
+        self.assertIn('MainThread;', profiles[0].read_text())
+
+
+class CommandAppsTests(SimpleTestCase):
+    def get_installed_apps(self, **env):
+        """Returns INSTALLED_APPS of current settings loaded in a new process."""
+        environ = os.environ.copy()
+        environ.pop('DJANGO_COMMAND_APPS', None)
+        environ.update(env, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [
+                sys.executable,
+                '-c',
+                'import json; from django.conf import settings; '
+                'print(json.dumps(settings.INSTALLED_APPS))',
+            ],
+            cwd=Path(settings.BASE_DIR).parent,
+            env=environ,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return json.loads(result.stdout)
+
+    def test_command_apps_are_installed_only_for_commands(self):
+        web_apps = self.get_installed_apps()
+
+        self.assertTrue(set(settings.COMMAND_APPS).isdisjoint(web_apps))
+        self.assertEqual(
+            self.get_installed_apps(DJANGO_COMMAND_APPS='1'),
+            web_apps + settings.COMMAND_APPS,
+        )
+        self.assertEqual(self.get_installed_apps(DJANGO_COMMAND_APPS='0'), web_apps)
+
+
+class WarmTemplatesTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        (self.root / 'partials').mkdir()
+        (self.root / 'page.html').write_text('page')
+        (self.root / 'partials' / 'item.html').write_text('item')
+        (self.root / 'logo.png').write_bytes(b'\x89PNG\r\n\xff')
+        (self.root / '.page.html.swp').write_text('')
+
+        overridden = override_settings(TEMPLATES=[{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'DIRS': [str(self.root)],
+            'OPTIONS': {
+                'loaders': [
+                    ('django.template.loaders.cached.Loader', [
+                        'django.template.loaders.filesystem.Loader',
+                    ]),
+                ],
+            },
+        }])
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+    def test_templates_are_compiled_into_the_cached_loader(self):
+        stdout = io.StringIO()
+
+        call_command('warm_templates', stdout=stdout)
+
+        self.assertIn('Compiled 2 templates', stdout.getvalue())
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertEqual(
+            set(loader.get_template_cache), {'page.html', 'partials/item.html'}
+        )
+
+    def test_syntax_errors_fail_the_command(self):
+        # Split so that cookiecutter doesn't render the tag.
+        (self.root / 'broken.html').write_text('{' '% if %' '}')
+        stderr = io.StringIO()
+
+        with self.assertRaisesMessage(CommandError, '1 templates have syntax errors.'):
+            call_command('warm_templates', stdout=io.StringIO(), stderr=stderr)
+
+        self.assertTrue(stderr.getvalue().startswith('broken.html: '))
@@ -0,0 +1,107 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Metrics of the sampled request being handled, None when not sampled.
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    """Counters and timings (in seconds) of a single sampled request."""
+
+    __slots__ = (
+        'started_at',
+        'total_time',
+        'db_queries',
+        'db_time',
+        'cache_hits',
+        'cache_misses',
+        'cache_time',
+        'template_time',
+        'asset_lookups',
+    )
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.total_time = 0.0
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time = 0.0
+        self.template_time = 0.0
+        self.asset_lookups = 0
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.started_at
+
+    def as_dict(self):
+        """Returns metrics for structured logs, times in milliseconds."""
+        return {
+            'total_ms': round(self.total_time * 1000, 2),
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_ms': round(self.cache_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'asset_lookups': self.asset_lookups,
+        }
+
+    def server_timing(self):
+        """Returns the value of the `Server-Timing` header."""
+        return ', '.join((
+            f'total;dur={self.total_time * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+            f'cache;dur={self.cache_time * 1000:.1f};'
+            f'desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'template;dur={self.template_time * 1000:.1f}',
+            f'assets;desc="{self.asset_lookups} lookups"',
+        ))
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """Database execute wrapper counting queries of the current metrics.
+
+    Metrics are looked up in the context rather than attached to connections
+    per request, as under ASGI sync views query on connections of another
+    thread.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_time += time.perf_counter() - started_at
+
+
+def install_execute_wrapper(connection, **kwargs):
+    """Adds `execute_wrapper` to a database connection once.
+
+    Receiver of `connection_created`, sent again on every reconnect.
+    """
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+@contextmanager
+def measure(field):
+    """Adds time spent in the block to a time field of the current metrics.
+
+    Args:
+        field - Name of a RequestMetrics time field, e.g. `template_time`.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(metrics, field, getattr(metrics, field) + time.perf_counter() - started_at)
@@ -0,0 +1,265 @@
+import csv
+import io
+import itertools
+import json
+import resource
+from datetime import datetime
+
+from django.contrib.auth.hashers import (
+    UNUSABLE_PASSWORD_PREFIX,
+    identify_hasher,
+    make_password,
+)
+from django.core.exceptions import ValidationError
+from django.db import connection, reset_queries, transaction
+from django.utils import timezone
+
+from .models import User
+
+# Columns of imported and exported files. Imported files may have a subset,
+# `username` is required.
+FIELDS = (
+    'username',
+    'email',
+    'first_name',
+    'last_name',
+    'password',
+    'is_active',
+    'is_staff',
+    'is_superuser',
+    'date_joined',
+    'last_login',
+)
+
+FORMATS = ('csv', 'ndjson')
+
+CONFLICT_ACTIONS = ('skip', 'update', 'error')
+
+# `hashed` takes Django password hashes (e.g. from `export_users`) as they
+# are, `raw` hashes plain text passwords, running the hasher for every row.
+PASSWORD_FORMATS = ('hashed', 'raw')
+
+# Staging table of COPY, emptied at the end of every chunk's transaction.
+STAGING_TABLE = 'user_import_staging'
+
+
+def get_peak_memory():
+    """Returns the peak resident memory of the process in MB."""
+    # Kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def read_rows(file, input_format):
+    """Yields (line number, {field: value}) of records of a CSV or NDJSON file.
+
+    Records are read one at a time, so files of any size can be imported.
+    """
+    if input_format == 'csv':
+        reader = csv.DictReader(file)
+        check_fields(reader.fieldnames or ())
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            raise ValueError(f'Line {number}: {error}') from error
+        if not isinstance(row, dict):
+            raise ValueError(f'Line {number}: expected an object')
+        check_fields(row)
+        yield number, row
+
+
+def check_fields(names):
+    unknown = set(names) - set(FIELDS)
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(sorted(unknown))}')
+    if 'username' not in names:
+        raise ValueError('The username field is required')
+
+
+def parse_user(row, password_format):
+    """Returns an unsaved User with values of a record.
+
+    Empty values are null in nullable fields and the model default where
+    there is one. A missing password makes the account passwordless
+    (an unusable password, like `set_unusable_password()`).
+    """
+    values = {}
+    for name, value in row.items():
+        field = User._meta.get_field(name)
+        if value in ('', None):
+            if field.null:
+                values[name] = None
+            elif not field.has_default():
+                values[name] = ''
+            continue
+
+        try:
+            value = field.to_python(value)
+        except ValidationError as error:
+            raise ValueError(f'{name}: {" ".join(error.messages)}') from error
+        if isinstance(value, datetime) and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        values[name] = value
+
+    if not values.get('username'):
+        raise ValueError('username: This field cannot be blank.')
+
+    password = values.pop('password', '')
+    if not password:
+        password = make_password(None)
+    elif password_format == 'raw':
+        password = make_password(password)
+    elif not password.startswith(UNUSABLE_PASSWORD_PREFIX):
+        try:
+            identify_hasher(password)
+        except ValueError:
+            raise ValueError('password: Not a password hash, import raw passwords.')
+
+    return User(password=password, **values)
+
+
+def bulk_create_users(users, update_fields, on_conflict):
+    options = {}
+    if on_conflict == 'update' and update_fields:
+        options = {
+            'update_conflicts': True,
+            'unique_fields': ['username'],
+            'update_fields': update_fields,
+        }
+    elif on_conflict != 'error':
+        options = {'ignore_conflicts': True}
+
+    User.objects.bulk_create(users, **options)
+
+
+def copy_users(users, update_fields, on_conflict):
+    """Loads users with PostgreSQL COPY through a temporary staging table."""
+    quote = connection.ops.quote_name
+    fields = [User._meta.get_field(name) for name in FIELDS]
+    columns = ', '.join(quote(field.column) for field in fields)
+    table = quote(User._meta.db_table)
+
+    conflict = ''
+    if on_conflict == 'update' and update_fields:
+        conflict = 'ON CONFLICT ({}) DO UPDATE SET {}'.format(
+            quote('username'),
+            ', '.join(
+                '{0} = EXCLUDED.{0}'.format(quote(User._meta.get_field(name).column))
+                for name in update_fields
+            ),
+        )
+    elif on_conflict != 'error':
+        # Also skips usernames and emails taken in another case.
+        conflict = 'ON CONFLICT DO NOTHING'
+
+    with connection.cursor() as cursor:
+        # Kept for the session, with the column types of the users table.
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} '
+            f'ON COMMIT DELETE ROWS AS SELECT {columns} FROM {table} WITH NO DATA'
+        )
+        # In an outer transaction (e.g. ATOMIC_REQUESTS or a TestCase) chunks
+        # don't commit, so rows of earlier chunks would still be there.
+        cursor.execute(f'TRUNCATE {STAGING_TABLE}')
+        with cursor.copy(f'COPY {STAGING_TABLE} ({columns}) FROM STDIN') as copy:
+            for user in users:
+                copy.write_row([getattr(user, field.attname) for field in fields])
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {STAGING_TABLE} '
+            f'{conflict}'
+        )
+
+
+def import_users(
+    rows,
+    on_conflict='skip',
+    password_format='hashed',
+    chunk_size=2000,
+    method=None,
+    progress=None,
+):
+    """Creates users from records in chunks, each in its own transaction.
+
+    Users already in the database (by username) are skipped, updated with
+    the fields of the record, or fail the import, as `on_conflict` says.
+    Skipped are also records whose username or email another user has in
+    a different case; `update` fails on them.
+    Within a chunk the last record of a username wins. An interrupted
+    import can be run again with `skip`.
+
+    Args:
+        rows - Iterable of (line number, {field: value}), see `read_rows`.
+        on_conflict - One of CONFLICT_ACTIONS.
+        password_format - One of PASSWORD_FORMATS.
+        chunk_size - Records per chunk.
+        method - `copy` (PostgreSQL only) or `bulk_create`, `copy` by
+            default on PostgreSQL.
+        progress - Called with the number of records read after every chunk.
+    Returns:
+        Number of records read.
+    Raises:
+        ValueError - A record is invalid, earlier chunks are saved.
+    """
+    if method is None:
+        method = 'copy' if connection.vendor == 'postgresql' else 'bulk_create'
+    load = copy_users if method == 'copy' else bulk_create_users
+    read = 0
+
+    for chunk in itertools.batched(rows, chunk_size):
+        # Structure: {username: User}
+        users = {}
+        present = set()
+        for line, row in chunk:
+            try:
+                user = parse_user(row, password_format)
+            except ValueError as error:
+                raise ValueError(f'Line {line}: {error}') from error
+            users[user.username] = user
+            present.update(row)
+
+        update_fields = [
+            name for name in FIELDS if name in present and name != 'username'
+        ]
+        with transaction.atomic():
+            load(list(users.values()), update_fields, on_conflict)
+
+        read += len(chunk)
+        # With DEBUG every query is kept, with its SQL of a whole chunk.
+        reset_queries()
+        if progress is not None:
+            progress(read)
+
+    return read
+
+
+def export_users(output_format, chunk_size=2000, fields=FIELDS):
+    """Yields lines of a CSV (with a header) or NDJSON file of all users.
+
+    Users are read with `iterator()`, a server-side cursor on PostgreSQL,
+    so only `chunk_size` of them are held in memory at once. Passwords are
+    exported as hashes, which `import_users` takes as they are.
+    """
+    rows = (
+        User.objects.order_by('pk').values_list(*fields).iterator(chunk_size=chunk_size)
+    )
+
+    if output_format == 'ndjson':
+        for values in rows:
+            record = dict(zip(fields, values))
+            # Unlike DjangoJSONEncoder, `isoformat()` keeps microseconds.
+            yield json.dumps(record, default=datetime.isoformat) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for values in itertools.chain([fields], rows):
+        writer.writerow(values)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
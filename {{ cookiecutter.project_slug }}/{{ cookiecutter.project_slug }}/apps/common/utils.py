@@ -1,3 +1,70 @@
+import base64
+import hashlib
+import json
+from collections import namedtuple
+from functools import cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.safestring import mark_safe
+
+from .consent import ACCEPT_VALUE, CONSENT_MAX_AGE, Consent
+
+# Characters escaped in JSON, so it can be embedded in a <script> block.
+JSON_SCRIPT_ESCAPES = {
+    ord('>'): '\\u003E',
+    ord('<'): '\\u003C',
+    ord('&'): '\\u0026',
+}
+
+GdprPayload = namedtuple('GdprPayload', ['json', 'script', 'csp_hash'])
+
+
+@cache
+def get_gdpr_payload():
+    """Returns `GDPR_SETTINGS` serialized for templates.
+
+    Computed once per process and reset when `GDPR_SETTINGS` changes
+    (e.g. with `override_settings` in tests).
+
+    Returns:
+        GdprPayload with the escaped JSON, the `<script>` block assigning it
+        to `GDPR_SETTINGS` and the CSP hash source (`'sha256-...'`) of the
+        script content, which may also be used as an ETag component.
+    """
+    data = json.dumps(settings.GDPR_SETTINGS).translate(JSON_SCRIPT_ESCAPES)
+    code = f'GDPR_SETTINGS = {data}'
+    digest = base64.b64encode(hashlib.sha256(code.encode()).digest()).decode()
+
+    return GdprPayload(
+        json=mark_safe(data),
+        script=mark_safe(f'<script type="text/javascript">{code}</script>'),
+        csp_hash=mark_safe(f"'sha256-{digest}'"),
+    )
+
+
+@receiver(setting_changed)
+def reset_gdpr_payload(setting, **kwargs):
+    if setting == 'GDPR_SETTINGS':
+        get_gdpr_payload.cache_clear()
+
+
+def get_consent(request) -> Consent:
+    """Returns consent state of the request, parsed once.
+
+    `ConsentMiddleware` attaches it lazily as `request.consent`, requests
+    which did not go through it get it attached here.
+
+    Args:
+        request(HttpRequest) - Incoming request.
+    """
+    consent = getattr(request, 'consent', None)
+    if consent is None:
+        consent = request.consent = Consent.from_request(request)
+    return consent
+
+
 def has_consent(request, name: str) -> bool:
     """Returns if consent cookie is available in `request.COOKIES`.
 
@@ -8,7 +75,7 @@ def has_consent(request, name: str) -> bool:
     Returns:
         True if cookie is in `request.COOKIES`, False otherwise.
     """
-    return name in request.COOKIES
+    return get_consent(request).has(name)
 
 
 def set_consent(response, name: str) -> None:
@@ -18,7 +85,7 @@ def set_consent(response, name: str) -> None:
         response(HttpResponse) - Response object.
         name - Name of cookie.
     """
-    response.set_cookie(name, 'accepted', max_age=1000)
+    response.set_cookie(name, ACCEPT_VALUE, max_age=CONSENT_MAX_AGE)
 
 
 def is_consent_accepted(request, name: str) -> bool:
@@ -31,7 +98,4 @@ def is_consent_accepted(request, name: str) -> bool:
     Returns:
         True if cookie specified by name was accepted.
     """
-    if has_consent(request, name):
-        return request.COOKIES[name] == 'accepted'
-    else:
-        return False
+    return get_consent(request).is_accepted(name)
@@ -1,3 +1,53 @@
-from django.shortcuts import render
+import os
 
-# Create your views here.
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from .profiler import FORMATS, get_output_dir, get_sibling_pids, request_profile, start_profiler
+
+
+@staff_member_required
+@require_http_methods(['GET', 'POST'])
+def profiler(request):
+    """Starts a sampling profiler capture in a worker.
+
+    GET lists PIDs of the worker handling the request and of its siblings,
+    and written profiles. POST starts a capture in the worker given by
+    `pid` (this one by default), for `duration` seconds in `format`.
+    """
+    own_pid = os.getpid()
+    workers = get_sibling_pids()
+
+    if request.method == 'GET':
+        output_dir = get_output_dir()
+        profiles = sorted(
+            path.name for path in output_dir.glob('*')
+            if path.name.endswith(tuple(FORMATS.values()))
+        ) if output_dir.is_dir() else []
+        return JsonResponse({'pid': own_pid, 'workers': workers, 'profiles': profiles})
+
+    try:
+        pid = int(request.POST.get('pid') or own_pid)
+        duration = float(request.POST['duration']) if request.POST.get('duration') else None
+    except ValueError:
+        return JsonResponse({'error': 'Invalid pid or duration.'}, status=400)
+
+    output_format = request.POST.get('format') or None
+    if output_format is not None and output_format not in FORMATS:
+        return JsonResponse({'error': f'Format must be one of {", ".join(FORMATS)}.'}, status=400)
+
+    if pid == own_pid:
+        path = start_profiler(duration, output_format)
+        if path is None:
+            return JsonResponse({'error': 'A capture is already running.'}, status=409)
+        return JsonResponse({'pid': pid, 'path': str(path)}, status=202)
+
+    if pid not in workers:
+        return JsonResponse({'error': f'{pid} is not a worker.'}, status=400)
+
+    try:
+        request_profile(pid, duration, output_format)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse({'pid': pid, 'path': str(get_output_dir())}, status=202)
@@ -1,6 +1,14 @@
 from django.urls import include, path
 from django.views.generic import TemplateView
 
+from {{ cookiecutter.project_slug }}.apps.common.page_cache import PageCacheMixin
+
+
+class HelloWorldView(PageCacheMixin, TemplateView):
+    template_name = 'hello_world.html'
+    page_cache_timeout = 300
+
+
 urlpatterns = [
-    path('world/', TemplateView.as_view(template_name='hello_world.html'))
+    path('world/', HelloWorldView.as_view())
 ]
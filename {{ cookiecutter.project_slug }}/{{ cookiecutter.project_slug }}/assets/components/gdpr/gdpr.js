@@ -1,8 +1,45 @@
 import { defineStore } from 'pinia';
-import { expired_at, cookieName, falseValue, acceptValue } from './gdpr_settings';
-
-// Helper to get cookie value (works after vue-cookies is installed)
-const getCookie = (name) => window.$cookies?.get(name) ?? null;
+import {
+    expired_at, cookieName, falseValue, acceptValue, packedCookieName, consentCategories,
+} from './gdpr_settings';
+
+// Bit of a cookie in the packed cookie, or -1 if it's kept in its own cookie.
+const packedBit = (name) => (packedCookieName ? consentCategories.indexOf(name) : -1);
+
+// Returns [given, accepted] bit flags of the packed cookie, `given.accepted` in hex.
+const readPacked = () => {
+    const [given, accepted] = (window.$cookies?.get(packedCookieName) ?? '').split('.');
+    const flags = [parseInt(given, 16), parseInt(accepted, 16)];
+    return flags.every(flag => flag >= 0) ? flags : [0, 0];
+};
+
+// Helper to get cookie value (works after vue-cookies is installed). Per-category
+// cookies override the packed one, as Django reads them.
+const getCookie = (name) => {
+    const value = window.$cookies?.get(name) ?? null;
+    const bit = packedBit(name);
+    if (value !== null || bit < 0) {
+        return value;
+    }
+    const [given, accepted] = readPacked();
+    if (!(given & (1 << bit))) {
+        return null;
+    }
+    return accepted & (1 << bit) ? acceptValue : falseValue;
+};
+
+// Helper to set cookie value, in the packed cookie for `consentCategories`.
+const setCookie = (name, value) => {
+    const bit = packedBit(name);
+    if (bit < 0) {
+        return window.$cookies?.set(name, value, expired_at);
+    }
+    let [given, accepted] = readPacked();
+    given |= 1 << bit;
+    accepted = value === acceptValue ? accepted | (1 << bit) : accepted & ~(1 << bit);
+    window.$cookies?.remove(name);
+    return window.$cookies?.set(packedCookieName, `${given.toString(16)}.${accepted.toString(16)}`, expired_at);
+};
 
 export const useGdprStore = defineStore('gdpr', {
     state: () => ({
@@ -82,10 +119,10 @@ export const useGdprStore = defineStore('gdpr', {
         setAllTrue() {
             Object.keys(this.permissions).forEach(name => {
                 this.permissions[name].value = acceptValue;
-                window.$cookies.set(this.permissions[name].cookieName, acceptValue, expired_at);
+                setCookie(this.permissions[name].cookieName, acceptValue);
             });
             this.wasAccepted = acceptValue;
-            window.$cookies.set(cookieName, acceptValue, expired_at);
+            setCookie(cookieName, acceptValue);
         },
 
         setAllFalse() {
@@ -100,20 +137,20 @@ export const useGdprStore = defineStore('gdpr', {
                 if (this.permissions[name].required) {
                     this.permissions[name].value = acceptValue;
                 }
-                window.$cookies.set(this.permissions[name].cookieName, this.permissions[name].value, expired_at);
+                setCookie(this.permissions[name].cookieName, this.permissions[name].value);
             });
             this.wasAccepted = acceptValue;
-            window.$cookies.set(cookieName, acceptValue, expired_at);
+            setCookie(cookieName, acceptValue);
             this.extendOpen = false;
         },
 
         saveAllCookiesSlow() {
             Object.keys(this.permissions).forEach(name => {
                 this.permissions[name].value = acceptValue;
-                window.$cookies.set(this.permissions[name].cookieName, acceptValue, expired_at);
+                setCookie(this.permissions[name].cookieName, acceptValue);
             });
             this.wasAccepted = acceptValue;
-            window.$cookies.set(cookieName, acceptValue, expired_at);
+            setCookie(cookieName, acceptValue);
             setTimeout(() => { this.extendOpen = false; }, 400);
         },
 
@@ -138,8 +175,8 @@ export const useGdprStore = defineStore('gdpr', {
 
 // Export helper functions for backward compatibility
 export const hasConsent = (name) => getCookie(name) !== null;
-export const setAcceptedConsent = (name) => window.$cookies?.set(name, acceptValue, expired_at);
-export const setDeclinedConsent = (name) => window.$cookies?.set(name, falseValue, expired_at);
+export const setAcceptedConsent = (name) => setCookie(name, acceptValue);
+export const setDeclinedConsent = (name) => setCookie(name, falseValue);
 export const getBasicConsent = () => getCookie(cookieName);
 export const getConsent = (name) => getCookie(name);
 export const isConsentAccepted = (name) => getCookie(name) === acceptValue;
@@ -12,4 +12,16 @@ const cookieName = 'gdpr';
 /** Cookies expire time. */
 const expired_at = 1000;
 
-export { acceptValue, falseValue, cookieName, expired_at }
+/**
+ * Name of a single cookie holding consents of `consentCategories`, the same as
+ * GDPR_CONSENT_COOKIE in Django settings. If null, per-category cookies are used.
+ */
+const packedCookieName = 'gdpr-consent';
+
+/**
+ * Cookies kept in the packed cookie, the same as GDPR_CONSENT_CATEGORIES in Django
+ * settings. Their order defines bits of the packed cookie, so only append new names.
+ */
+const consentCategories = ['gdpr', 'gdpr-personalization', 'gdpr-analytics', 'gdpr-example'];
+
+export { acceptValue, falseValue, cookieName, expired_at, packedCookieName, consentCategories }
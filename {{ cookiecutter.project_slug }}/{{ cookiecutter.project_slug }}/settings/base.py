@@ -44,16 +44,28 @@ INSTALLED_APPS = [
     'crispy_forms',
     'crispy_bootstrap5',
     'mail_templated',
-    'django_extensions',
 
     '{{ cookiecutter.project_slug }}.apps.common',
     '{{ cookiecutter.project_slug }}.apps.hello_world'
 ]
 
+# Apps used only by management commands (e.g. `shell_plus`, `show_urls`).
+# `manage.py` and `manage.dist.py` install them by setting DJANGO_COMMAND_APPS,
+# web workers (`wsgi.py`, `asgi.py`) don't import them. Set
+# DJANGO_COMMAND_APPS=0 to leave them out of a command too, e.g. in cron jobs.
+# `./manage.py profile_imports` shows what each app costs at startup.
+COMMAND_APPS = [
+    'django_extensions',
+]
+
+if env.bool('DJANGO_COMMAND_APPS', default=False):
+    INSTALLED_APPS += COMMAND_APPS
+
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = 'bootstrap5'
 
 MIDDLEWARE = [
+    '{{ cookiecutter.project_slug }}.apps.common.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,6 +73,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    '{{ cookiecutter.project_slug }}.apps.common.middleware.ConsentMiddleware',
+    '{{ cookiecutter.project_slug }}.apps.common.middleware.AssetPreloadMiddleware',
 ]
 
 ROOT_URLCONF = '{{ cookiecutter.project_slug }}.urls'
@@ -86,6 +100,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = '{{ cookiecutter.project_slug }}.wsgi.application'
+ASGI_APPLICATION = '{{ cookiecutter.project_slug }}.asgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -100,6 +115,51 @@ try:
 except ImportError:
     pass
 
+# Connections are kept open between requests for `DATABASE_CONN_MAX_AGE`
+# seconds and checked before reuse. With `DATABASE_POOL` enabled every
+# process takes PostgreSQL connections from a psycopg pool instead.
+# Dist settings apply these with `configure_databases(DATABASES)`; local and ci
+# settings keep Django's per-request connections.
+DATABASE_CONN_MAX_AGE = env.int('DATABASE_CONN_MAX_AGE', default=60)
+DATABASE_POOL = env.bool('DATABASE_POOL', default=False)
+DATABASE_POOL_MIN_SIZE = env.int('DATABASE_POOL_MIN_SIZE', default=2)
+DATABASE_POOL_MAX_SIZE = env.int('DATABASE_POOL_MAX_SIZE', default=10)
+DATABASE_POOL_TIMEOUT = env.float('DATABASE_POOL_TIMEOUT', default=10.0)
+
+
+def configure_databases(databases):
+    """Returns DATABASES with connection reuse set up.
+
+    Values set explicitly in a database config (or in DATABASE_URL) win.
+    Safe to apply more than once.
+
+    Args:
+        databases - DATABASES setting to configure.
+    """
+    configured = {}
+
+    for alias, database in databases.items():
+        database = dict(database)
+        database.setdefault('CONN_HEALTH_CHECKS', True)
+
+        if DATABASE_POOL and database.get('ENGINE') == 'django.db.backends.postgresql':
+            options = dict(database.get('OPTIONS', {}))
+            options.setdefault('pool', {
+                'min_size': DATABASE_POOL_MIN_SIZE,
+                'max_size': DATABASE_POOL_MAX_SIZE,
+                'timeout': DATABASE_POOL_TIMEOUT,
+            })
+            database['OPTIONS'] = options
+            # Pooled connections are returned to the pool after each request.
+            database['CONN_MAX_AGE'] = 0
+        else:
+            database.setdefault('CONN_MAX_AGE', DATABASE_CONN_MAX_AGE)
+
+        configured[alias] = database
+
+    return configured
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/topics/auth/passwords/#module-django.contrib.auth.password_validation
 
@@ -151,9 +211,74 @@ FILE_UPLOAD_PERMISSIONS = 0o644
 
 AUTH_USER_MODEL = 'common.User'
 
+# Users log in with their username or email address, case-insensitively.
+AUTHENTICATION_BACKENDS = [
+    '{{ cookiecutter.project_slug }}.apps.common.backends.EmailOrUsernameBackend',
+]
+
+# `last_login` is updated on login only when older than this many seconds (0
+# on every login, as Django does). Password reset links are invalidated by
+# updates of `last_login`, so not by logins within the interval.
+LAST_LOGIN_UPDATE_INTERVAL = 300
+
+# Seconds users' permission sets are kept in the default cache, dropped
+# sooner when their groups or permissions change (0 disables caching).
+PERMISSION_CACHE_TIMEOUT = 60 * 60
+
+# Send `103 Early Hints` with preload links of previously seen URL patterns.
+# Requires gunicorn behind a proxy which forwards 1xx responses.
+ASSETS_EARLY_HINTS = False
+
+# Share of requests measured by `ServerTimingMiddleware` (0 to 1) and whether
+# their metrics are sent to clients in a `Server-Timing` header.
+SERVER_TIMING_SAMPLE_RATE = 1.0
+SERVER_TIMING_HEADER = True
+
+# Sampling profiler captures, started with SIGPROF or `/admin/profiler/`
+# (see `apps/common/profiler.py`).
+PROFILER_OUTPUT_DIR = os.path.join(os.path.dirname(BASE_DIR), 'logs', 'profiles')
+PROFILER_DURATION = 10
+PROFILER_INTERVAL = 0.005
+PROFILER_FORMAT = 'speedscope'
+
+# Messages sent with `QueuedEmailBackend` are stored in the database and
+# delivered over SMTP (EMAIL_HOST...) by `./manage.py send_queued_email`.
+# Failed attempts are retried after EMAIL_QUEUE_RETRY_DELAY seconds, doubled
+# with each attempt up to EMAIL_QUEUE_MAX_RETRY_DELAY, EMAIL_QUEUE_RATE_LIMIT
+# is in messages per second (0 for no limit).
+EMAIL_QUEUE_BATCH_SIZE = env.int('EMAIL_QUEUE_BATCH_SIZE', default=50)
+EMAIL_QUEUE_POLL_INTERVAL = env.float('EMAIL_QUEUE_POLL_INTERVAL', default=2.0)
+EMAIL_QUEUE_RATE_LIMIT = env.float('EMAIL_QUEUE_RATE_LIMIT', default=0)
+EMAIL_QUEUE_MESSAGES_PER_CONNECTION = env.int(
+    'EMAIL_QUEUE_MESSAGES_PER_CONNECTION', default=100
+)
+EMAIL_QUEUE_MAX_ATTEMPTS = env.int('EMAIL_QUEUE_MAX_ATTEMPTS', default=8)
+EMAIL_QUEUE_RETRY_DELAY = env.int('EMAIL_QUEUE_RETRY_DELAY', default=60)
+EMAIL_QUEUE_MAX_RETRY_DELAY = env.int('EMAIL_QUEUE_MAX_RETRY_DELAY', default=3600)
+
+# Admin changelists of `LargeTableAdminMixin` (e.g. users) use estimated
+# counts of PostgreSQL from this many results on and page through them by
+# keyset links instead of page numbers.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # GDPR settings.
 GDPR_SETTINGS = {}
+
+# Consent cookies known to `request.consent`, in a fixed order (each is a bit
+# in the packed cookie, so only append new names). The same as
+# `consentCategories` in `assets/components/gdpr/gdpr_settings.js`.
+GDPR_CONSENT_CATEGORIES = [
+    'gdpr',
+    'gdpr-personalization',
+    'gdpr-analytics',
+    'gdpr-example',
+]
+
+# Name of a single cookie holding all consents of GDPR_CONSENT_CATEGORIES, the
+# same as `packedCookieName` in JS. If None, consents are kept in per-category
+# cookies.
+GDPR_CONSENT_COOKIE = 'gdpr-consent'
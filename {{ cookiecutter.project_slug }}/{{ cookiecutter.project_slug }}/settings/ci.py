@@ -3,6 +3,8 @@ CI/CD settings for automated testing.
 
 Uses environment variables for database configuration.
 """
+from fakeredis import FakeConnection
+
 from .base import *
 
 DATABASES = {
@@ -21,3 +23,20 @@ FIXTURE_DIRS = [
     os.path.join(BASE_DIR, 'fixtures', 'tests'),
     os.path.join(BASE_DIR, 'fixtures', 'dist'),
 ]
+
+# The dist cache setup with an in-process Redis stand-in (fakeredis).
+CACHES = {
+    'default': {
+        'BACKEND': '{{ cookiecutter.project_slug }}.apps.common.cache.TieredCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'SHARED': {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'LOCATION': 'redis://{{ cookiecutter.project_slug }}-cache:6379/0',
+                'OPTIONS': {
+                    'connection_class': FakeConnection,
+                },
+            },
+        },
+    },
+}
@@ -3,7 +3,10 @@ from .email import *
 
 DEBUG = False
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+DATABASES = configure_databases(DATABASES)
+
+# Delivered by `./manage.dist.py send_queued_email` (see `bin/email-worker.base`).
+EMAIL_BACKEND = '{{ cookiecutter.project_slug }}.apps.common.mail.QueuedEmailBackend'
 
 ALLOWED_HOSTS = ['{{ cookiecutter.project_slug }}.makimo.pl', 'localhost']
 
@@ -25,8 +28,12 @@ LOGGING = {
             'format': '%(levelname)s %(message)s'
         },
         'json_formatter': {
-            'class': '{{ cookiecutter.project_slug }}.apps.common.formatters.DjangoRequestJsonFormatter',
-            'format': '%(levelname)s %(asctime)s %(module)s %(process)d %(thread)d %(message)s'
+            '()': '{{ cookiecutter.project_slug }}.apps.common.formatters.DjangoRequestJsonFormatter',
+            'format': '%(levelname)s %(asctime)s %(module)s %(process)d %(thread)d %(message)s',
+            'max_body_size': 2048,
+            'max_header_size': 256,
+            'header_allowlist': None,
+            'header_denylist': ['Authorization', 'Cookie', 'Proxy-Authorization', 'X-Csrftoken'],
         },
     },
     'handlers': {
@@ -37,15 +44,26 @@ LOGGING = {
         'console_json': {
             'class': 'logging.StreamHandler',
             'formatter': 'json_formatter'
-        }
+        },
+        # Formats and writes records of `console_json` in a background thread.
+        'queue_json': {
+            'class': '{{ cookiecutter.project_slug }}.apps.common.log_handlers.BoundedQueueHandler',
+            'handlers': ['console_json'],
+            'queue': {
+                '()': 'queue.Queue',
+                'maxsize': 10000,
+            },
+            'listener': '{{ cookiecutter.project_slug }}.apps.common.log_handlers.FlushingQueueListener',
+            'respect_handler_level': True,
+        },
     },
     'loggers': {
         'apps': {
             "level": "DEBUG",
-            "handlers": ["console_json"],
+            "handlers": ["queue_json"],
         },
         'django': {
-            'handlers': ["console_json"],
+            'handlers': ["queue_json"],
             'level': 'INFO',
             'propagate': True,
         }
@@ -54,23 +72,59 @@ LOGGING = {
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'static', 'dist')
 
+# Templates are compiled once per process; gunicorn compiles all of them at
+# boot with the `warm_templates` command (see `bin/gunicorn.conf.py`).
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
 FIXTURE_DIRS = [
     os.path.join(BASE_DIR, 'fixtures', 'dist'),
 ]
 
+# Per-process LRU in front of Redis shared by all workers and hosts.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
-        'LOCATION': '/var/tmp/django_cache',
-    }
+        'BACKEND': '{{ cookiecutter.project_slug }}.apps.common.cache.TieredCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'SHARED': {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'LOCATION': env('REDIS_URL', default='redis://127.0.0.1:6379/0'),
+                'KEY_PREFIX': '{{ cookiecutter.project_slug }}',
+            },
+            'MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+            'SYNC_INTERVAL': 1,
+        },
+    },
+}
+
+# Static files are hashed and precompressed (brotli/zstd/gzip) by collectstatic
+# and served with the best `Accept-Encoding` match right after SecurityMiddleware.
+MIDDLEWARE.insert(
+    MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+    '{{ cookiecutter.project_slug }}.apps.common.middleware.PrecompressedStaticMiddleware',
+)
+
+SERVER_TIMING_SAMPLE_RATE = env.float('SERVER_TIMING_SAMPLE_RATE', default=0.01)
+SERVER_TIMING_HEADER = env.bool('SERVER_TIMING_HEADER', default=True)
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': '{{ cookiecutter.project_slug }}.apps.common.storage.CompressedManifestStaticFilesStorage',
+    },
 }
 
-# Settings used to configurate whitenoise if needed
-# MIDDLEWARE = [
-#     'django.middleware.security.SecurityMiddleware',
-#     'whitenoise.middleware.WhiteNoiseMiddleware',
-# ] + MIDDLEWARE
-# STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Compressed data of unchanged files is reused from here between deploys.
+STATIC_COMPRESS_CACHE_DIR = env('STATIC_COMPRESS_CACHE_DIR', default=None)
 
 # Uncomment this if you want to allow logging to sentry from django app
 # from .sentry import *
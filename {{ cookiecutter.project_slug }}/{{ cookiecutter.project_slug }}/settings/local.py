@@ -13,6 +13,8 @@ DATABASES = {
     }
 }
 
+from fakeredis import FakeConnection
+
 from .base import *
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
@@ -42,3 +44,19 @@ INTERNAL_IPS = [
     '127.0.0.1'
 ]
 
+# The dist cache setup with an in-process Redis stand-in (fakeredis).
+CACHES = {
+    'default': {
+        'BACKEND': '{{ cookiecutter.project_slug }}.apps.common.cache.TieredCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'SHARED': {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'LOCATION': 'redis://{{ cookiecutter.project_slug }}-cache:6379/0',
+                'OPTIONS': {
+                    'connection_class': FakeConnection,
+                },
+            },
+        },
+    },
+}
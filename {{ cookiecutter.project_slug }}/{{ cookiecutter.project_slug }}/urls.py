@@ -3,8 +3,11 @@ from django.contrib import admin
 from django.conf import settings
 from django.urls import path, include
 
+from {{ cookiecutter.project_slug }}.apps.common.views import profiler
+
 
 urlpatterns = [
+    path('admin/profiler/', profiler, name='profiler'),
     path('admin/', admin.site.urls),
     path('hello/', include('{{ cookiecutter.project_slug }}.apps.hello_world.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)